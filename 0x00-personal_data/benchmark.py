@@ -0,0 +1,268 @@
+#!/usr/bin/env python3
+"""
+Benchmark suite for the redaction and hashing helpers of 0x00.
+
+Usage: ./benchmark.py [--quick] [--output results.json]
+                      [--compare baseline.json] [--hash-scaling]
+"""
+
+import argparse
+import json
+import logging
+import os
+import platform
+import random
+import re
+import string
+import subprocess
+import time
+import tracemalloc
+from typing import Callable, Dict, List, Tuple
+
+from encrypt_password import hash_password, hash_passwords, is_valid
+from filtered_logger import (PII_FIELDS, RedactingFormatter, filter_datum,
+                             filter_datum_scan)
+
+FIELD_COUNTS = (8, 32, 128)
+PII_DENSITIES = (0.1, 0.5)
+VALUE_LENGTHS = (8, 64)
+ITERATIONS = 20000
+QUICK_ITERATIONS = 2000
+HASH_ITERATIONS = 8
+HASHES_PER_WORKER = 8
+SEED = 1234
+
+
+def uncached_filter_datum(fields: List[str], redaction: str, message: str,
+                          separator: str) -> str:
+    """
+    Reference filter_datum that rebuilds its pattern on every call.
+    """
+    return re.sub(
+        fr"({'|'.join(fields)})=.*?{separator}",
+        lambda m: f"{m.group(1)}={redaction}{separator}",
+        message
+    )
+
+
+def generate_row(field_count: int, pii_density: float, value_length: int,
+                 rng: random.Random) -> Tuple[List[str], List[str]]:
+    """
+    Builds a synthetic row with a share of PII columns.
+
+    Args:
+        field_count: Number of columns.
+        pii_density: Fraction of columns named after a PII field.
+        value_length: Length of every value.
+        rng: Random generator, seeded for reproducible rows.
+
+    Returns:
+        Tuple of (column names, values).
+    """
+    pii_count = max(1, round(field_count * pii_density))
+    columns = [PII_FIELDS[i % len(PII_FIELDS)] if i < pii_count
+               else "col{}".format(i) for i in range(field_count)]
+    rng.shuffle(columns)
+    alphabet = string.ascii_letters + string.digits
+    values = ["".join(rng.choice(alphabet) for _ in range(value_length))
+              for _ in columns]
+    return columns, values
+
+
+def measure(func: Callable[[], object], iterations: int) -> Dict[str, float]:
+    """
+    Times func call by call and samples its memory allocation.
+
+    Args:
+        func: Zero-argument callable under test.
+        iterations: Number of timed calls.
+
+    Returns:
+        Dictionary with ops_per_sec, p50_us, p99_us and
+        alloc_bytes_per_call (peak traced allocation of one call).
+    """
+    clock = time.perf_counter
+    timings = []
+    for _ in range(iterations):
+        start = clock()
+        func()
+        timings.append(clock() - start)
+    timings.sort()
+
+    samples = min(iterations, 100)
+    tracemalloc.start()
+    peak = 0
+    for _ in range(samples):
+        tracemalloc.reset_peak()
+        baseline = tracemalloc.get_traced_memory()[0]
+        func()
+        peak += tracemalloc.get_traced_memory()[1] - baseline
+    tracemalloc.stop()
+
+    return {
+        "ops_per_sec": iterations / sum(timings),
+        "p50_us": timings[len(timings) // 2] * 1e6,
+        "p99_us": timings[min(len(timings) - 1,
+                              int(len(timings) * 0.99))] * 1e6,
+        "alloc_bytes_per_call": peak / samples,
+    }
+
+
+def redaction_cases(columns: List[str],
+                    values: List[str]) -> List[Tuple[str, Callable]]:
+    """
+    Returns the redaction paths to benchmark for one synthetic row.
+    """
+    fields = list(PII_FIELDS)
+    message = "".join("{}={};".format(column, value)
+                      for column, value in zip(columns, values))
+    formatter = RedactingFormatter(fields=fields)
+    scan_formatter = RedactingFormatter(fields=fields, engine="scan")
+    record = logging.LogRecord("user_data", logging.INFO, None, None,
+                               message, None, None)
+    row_record = logging.LogRecord("user_data", logging.INFO, None, None,
+                                   "%s", (tuple(values),), None)
+    row_record.row_columns = columns
+    return [
+        ("filter_datum_uncached",
+         lambda: uncached_filter_datum(fields, "***", message, ";")),
+        ("filter_datum",
+         lambda: filter_datum(fields, "***", message, ";")),
+        ("filter_datum_scan",
+         lambda: filter_datum_scan(fields, "***", message, ";")),
+        ("formatter_regex", lambda: formatter.format(record)),
+        ("formatter_scan", lambda: scan_formatter.format(record)),
+        ("formatter_row", lambda: formatter.format(row_record)),
+    ]
+
+
+def run_suite(iterations: int) -> List[Dict[str, object]]:
+    """
+    Runs every redaction and hashing case and prints one line per result.
+    """
+    rng = random.Random(SEED)
+    results = []
+
+    def record_result(case: str, params: Dict[str, object],
+                      stats: Dict[str, float]):
+        """
+        Stores and prints one benchmark result.
+        """
+        results.append(dict(case=case, params=params, **stats))
+        print("{:<22} {:<28} {:>12,.0f} ops/s  p50 {:>8.1f}us  "
+              "p99 {:>8.1f}us  {:>8.0f} B/call".format(
+                  case, " ".join("{}={}".format(k, v)
+                                 for k, v in params.items()),
+                  stats["ops_per_sec"], stats["p50_us"], stats["p99_us"],
+                  stats["alloc_bytes_per_call"]))
+
+    for field_count in FIELD_COUNTS:
+        for density in PII_DENSITIES:
+            for length in VALUE_LENGTHS:
+                columns, values = generate_row(field_count, density,
+                                               length, rng)
+                params = {"fields": field_count, "pii": density,
+                          "len": length}
+                for case, func in redaction_cases(columns, values):
+                    record_result(case, params, measure(func, iterations))
+
+    hashed = hash_password("benchmark")
+    record_result("hash_password", {},
+                  measure(lambda: hash_password("benchmark"),
+                          HASH_ITERATIONS))
+    record_result("is_valid", {},
+                  measure(lambda: is_valid(hashed, "benchmark"),
+                          HASH_ITERATIONS))
+    return results
+
+
+def hashing_scaling():
+    """
+    Prints hash_passwords throughput for 1 up to os.cpu_count() threads.
+    """
+    cores = os.cpu_count() or 1
+    workers = 1
+    while True:
+        passwords = ["password{}".format(i)
+                     for i in range(HASHES_PER_WORKER * workers)]
+        start = time.perf_counter()
+        for _ in hash_passwords(passwords, workers=workers):
+            pass
+        rate = len(passwords) / (time.perf_counter() - start)
+        print("hash_passwords x{:<3}          {:>12,.1f} hashes/s".format(
+            workers, rate))
+        if workers >= cores:
+            break
+        workers = min(workers * 2, cores)
+
+
+def environment() -> Dict[str, object]:
+    """
+    Describes the host and revision the results were measured on.
+    """
+    try:
+        commit = subprocess.run(
+            ["git", "rev-parse", "HEAD"], stdout=subprocess.PIPE,
+            stderr=subprocess.DEVNULL, check=True).stdout.decode().strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    return {
+        "commit": commit,
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpus": os.cpu_count(),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+    }
+
+
+def compare(baseline_path: str, results: List[Dict[str, object]]):
+    """
+    Prints the ops/sec ratio of each result against a saved baseline.
+    """
+    with open(baseline_path, "r") as f:
+        baseline = json.load(f)
+
+    def key(result: Dict[str, object]) -> str:
+        """
+        Identifies a result by case name and parameters.
+        """
+        return json.dumps([result["case"], result["params"]],
+                          sort_keys=True)
+
+    previous = {key(result): result for result in baseline["results"]}
+    for result in results:
+        old = previous.get(key(result))
+        if old is None:
+            continue
+        print("{:<22} {:<28} {:>6.2f}x".format(
+            result["case"], " ".join("{}={}".format(k, v)
+                                     for k, v in result["params"].items()),
+            result["ops_per_sec"] / old["ops_per_sec"]))
+
+
+def main():
+    """
+    Runs the suite and optionally saves or compares JSON results.
+    """
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--quick", action="store_true",
+                        help="fewer iterations per case")
+    parser.add_argument("--output", help="write results to this JSON file")
+    parser.add_argument("--compare", help="baseline JSON file to compare")
+    parser.add_argument("--hash-scaling", action="store_true",
+                        help="also measure hash_passwords thread scaling")
+    args = parser.parse_args()
+
+    results = run_suite(QUICK_ITERATIONS if args.quick else ITERATIONS)
+    if args.hash_scaling:
+        hashing_scaling()
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump({"environment": environment(), "results": results},
+                      f, indent=2)
+    if args.compare:
+        compare(args.compare, results)
+
+
+if __name__ == "__main__":
+    main()
@@ -3,20 +3,113 @@
 This module handles secure password hashing and verification.
 """
 
+import os
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Iterable, Iterator, Optional, Tuple
+
 import bcrypt
 
+DEFAULT_COST = 12
+MIN_COST = 4
+MAX_COST = 31
+CALIBRATION_COST = 8
+
+_cost = DEFAULT_COST
+
 
-def hash_password(password: str) -> bytes:
+def hash_password(password: str, cost: int = None) -> bytes:
     """
     Hash a password using bcrypt with a salt.
 
     Args:
         password: The password string to hash.
+        cost: bcrypt cost factor, defaults to the current cost (see
+            calibrate_cost).
 
     Returns:
         A salted, hashed password as a byte string.
     """
-    return bcrypt.hashpw(password.encode(), bcrypt.gensalt())
+    return bcrypt.hashpw(password.encode(), bcrypt.gensalt(cost or _cost))
+
+
+def get_cost() -> int:
+    """
+    Return the cost factor used for new hashes.
+    """
+    return _cost
+
+
+def set_cost(cost: int):
+    """
+    Set the cost factor used for new hashes.
+
+    Args:
+        cost: bcrypt cost factor between MIN_COST and MAX_COST.
+    """
+    global _cost
+    if not MIN_COST <= cost <= MAX_COST:
+        raise ValueError("bcrypt cost must be between {} and {}".format(
+            MIN_COST, MAX_COST))
+    _cost = cost
+
+
+def _time_hash(cost: int) -> float:
+    """
+    Measure how long one bcrypt hash takes at a given cost on this host.
+    """
+    salt = bcrypt.gensalt(cost)
+    start = time.perf_counter()
+    bcrypt.hashpw(b"calibration", salt)
+    return time.perf_counter() - start
+
+
+def calibrate_cost(target_seconds: float = 0.05,
+                   apply: bool = True) -> int:
+    """
+    Pick the highest cost whose hash time fits target_seconds on this host.
+
+    Each cost step doubles bcrypt's work, so the estimate is extrapolated
+    from a cheap measurement and then confirmed at the chosen cost.
+
+    Args:
+        target_seconds: Latency budget for one hash or verification.
+        apply: Whether to use the result for new hashes.
+
+    Returns:
+        The calibrated cost factor.
+    """
+    base = min(_time_hash(CALIBRATION_COST) for _ in range(3))
+    cost = CALIBRATION_COST
+    while cost < MAX_COST and base * 2 ** (cost + 1 - CALIBRATION_COST) \
+            <= target_seconds:
+        cost += 1
+    while cost > MIN_COST and _time_hash(cost) > target_seconds:
+        cost -= 1
+    if apply:
+        set_cost(cost)
+    return cost
+
+
+def hash_cost(hashed_password: bytes) -> int:
+    """
+    Read the cost factor stored in a bcrypt hash.
+
+    Args:
+        hashed_password: A hash in "$2b$<cost>$..." form.
+
+    Returns:
+        The cost factor the hash was created with.
+    """
+    return int(hashed_password.split(b"$")[2])
+
+
+def needs_rehash(hashed_password: bytes) -> bool:
+    """
+    Tell whether a hash was created with a cost other than the current one.
+    """
+    return hash_cost(hashed_password) != _cost
 
 
 def is_valid(hashed_password: bytes, password: str) -> bool:
@@ -32,3 +125,81 @@ def is_valid(hashed_password: bytes, password: str) -> bool:
     """
     return bcrypt.checkpw(password.encode(), hashed_password)
 
+
+def verify_and_rehash(hashed_password: bytes,
+                      password: str) -> Tuple[bool, Optional[bytes]]:
+    """
+    Verify a password and upgrade its hash if the cost is outdated.
+
+    Args:
+        hashed_password: The stored hashed password.
+        password: The plaintext password to check.
+
+    Returns:
+        (valid, new_hash): new_hash is a fresh hash at the current cost
+        when the password is valid and the stored cost is outdated,
+        None otherwise. Callers should persist new_hash when set.
+    """
+    if not is_valid(hashed_password, password):
+        return False, None
+    if needs_rehash(hashed_password):
+        return True, hash_password(password)
+    return True, None
+
+
+def _ordered_map(func: Callable, items: Iterable,
+                 workers: int = None) -> Iterator:
+    """
+    Apply func to items on a thread pool, yielding results in input order.
+
+    bcrypt releases the GIL, so hashes run in parallel. At most twice the
+    number of workers are in flight, so arbitrarily long iterables are
+    consumed lazily.
+
+    Args:
+        func: Callable applied to each item.
+        items: Iterable of arguments for func.
+        workers: Number of threads, defaults to the CPU count.
+
+    Yields:
+        func(item) for each item, in order.
+    """
+    workers = workers or os.cpu_count() or 1
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        pending = deque()
+        for item in items:
+            pending.append(executor.submit(func, item))
+            if len(pending) >= 2 * workers:
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
+
+
+def hash_passwords(passwords: Iterable[str],
+                   workers: int = None) -> Iterator[bytes]:
+    """
+    Hash many passwords concurrently.
+
+    Args:
+        passwords: Iterable of password strings.
+        workers: Number of threads, defaults to the CPU count.
+
+    Yields:
+        The hashed password for each input, in order.
+    """
+    return _ordered_map(hash_password, passwords, workers)
+
+
+def verify_many(pairs: Iterable[Tuple[bytes, str]],
+                workers: int = None) -> Iterator[bool]:
+    """
+    Verify many (hashed_password, password) pairs concurrently.
+
+    Args:
+        pairs: Iterable of (hashed_password, password) tuples.
+        workers: Number of threads, defaults to the CPU count.
+
+    Yields:
+        is_valid's result for each pair, in order.
+    """
+    return _ordered_map(lambda pair: is_valid(*pair), pairs, workers)
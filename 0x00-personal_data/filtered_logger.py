@@ -5,11 +5,106 @@ Module for filtering and logging personal data securely.
 
 import re
 import logging
+import logging.handlers
 import os
+import functools
+import queue
+import threading
+import time
 import mysql.connector
-from typing import List
+from collections.abc import Mapping
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterator, List, Sequence, Tuple
 
 PII_FIELDS = ("name", "email", "phone", "ssn", "password")
+REDACTOR_CACHE_SIZE = 128
+DEFAULT_BATCH_SIZE = 1000
+LOG_QUEUE_SIZE = 10000
+OVERFLOW_POLICIES = ("block", "drop", "sample")
+OVERFLOW_SAMPLE_RATE = 10
+DEFAULT_POOL_SIZE = 5
+DEFAULT_POOL_TIMEOUT = 30
+
+
+@functools.lru_cache(maxsize=REDACTOR_CACHE_SIZE)
+def _compile_redactor(fields: Tuple[str, ...], redaction: str,
+                      separator: str) -> Callable[[str], str]:
+    """
+    Builds a reusable redaction callable for a set of fields.
+
+    The pattern is compiled once per (fields, redaction, separator) key and
+    kept in a bounded LRU cache, so repeated calls skip regex construction.
+
+    Args:
+        fields: Tuple of field names to redact.
+        redaction: String to replace field values with.
+        separator: Character separating fields in the message.
+
+    Returns:
+        A callable taking a message and returning it obfuscated.
+    """
+    pattern = re.compile(fr"({'|'.join(fields)})=.*?{separator}")
+    suffix = f"={redaction}{separator}"
+    return functools.partial(pattern.sub, lambda m: m.group(1) + suffix)
+
+
+@functools.lru_cache(maxsize=REDACTOR_CACHE_SIZE)
+def _compile_scan_redactor(fields: Tuple[str, ...], redaction: str,
+                           separator: str) -> Callable[[str], str]:
+    """
+    Builds a single-pass redaction callable that avoids the regex engine.
+
+    Each "field=" needle is located with str.find, the hits are walked once
+    in message order and the result is rebuilt with one join, so only PII
+    fields cost Python-level work. Output matches _compile_redactor for
+    literal field names and separators; it is fastest on wide rows.
+
+    Args:
+        fields: Tuple of field names to redact.
+        redaction: String to replace field values with.
+        separator: Character separating fields in the message.
+
+    Returns:
+        A callable taking a message and returning it obfuscated.
+    """
+    needles = [(field + "=", len(field) + 1) for field in frozenset(fields)]
+
+    def redact(message: str) -> str:
+        """
+        Obfuscates the configured fields of message.
+        """
+        hits = []
+        for needle, size in needles:
+            start = message.find(needle)
+            while start != -1:
+                hits.append((start, start + size))
+                start = message.find(needle, start + 1)
+        if not hits:
+            return message
+        hits.sort()
+        parts = []
+        position = 0
+        for start, value in hits:
+            if start < position:
+                continue
+            end = message.find(separator, value)
+            if end == -1:
+                break
+            if message.find("\n", value, end) != -1:
+                continue
+            parts.append(message[position:value])
+            parts.append(redaction)
+            position = end
+        parts.append(message[position:])
+        return "".join(parts)
+
+    return redact
+
+
+REDACTION_ENGINES = {
+    "regex": _compile_redactor,
+    "scan": _compile_scan_redactor,
+}
 
 
 def filter_datum(fields: List[str], redaction: str, message: str, separator: str) -> str:
@@ -25,11 +120,28 @@ def filter_datum(fields: List[str], redaction: str, message: str, separator: str
     Returns:
         The obfuscated log message.
     """
-    return re.sub(
-        fr"({'|'.join(fields)})=.*?{separator}",
-        lambda m: f"{m.group(1)}={redaction}{separator}",
-        message
-    )
+    return _compile_redactor(tuple(fields), redaction, separator)(message)
+
+
+def filter_datum_scan(fields: List[str], redaction: str, message: str,
+                      separator: str) -> str:
+    """
+    Obfuscates specified fields in a log message without a regex.
+
+    Same contract and output as filter_datum, using the single-pass
+    scan engine.
+
+    Args:
+        fields: List of field names to redact.
+        redaction: String to replace field values with.
+        message: The original log message.
+        separator: Character separating fields in the message.
+
+    Returns:
+        The obfuscated log message.
+    """
+    return _compile_scan_redactor(
+        tuple(fields), redaction, separator)(message)
 
 
 class RedactingFormatter(logging.Formatter):
@@ -41,50 +153,281 @@ class RedactingFormatter(logging.Formatter):
     FORMAT = "[HOLBERTON] %(name)s %(levelname)s %(asctime)-15s: %(message)s"
     SEPARATOR = ";"
 
-    def __init__(self, fields: List[str]):
+    def __init__(self, fields: List[str], engine: str = "regex"):
         """
         Initializes the formatter with fields to redact.
 
         Args:
             fields: List of field names to redact.
+            engine: Redaction engine, one of REDACTION_ENGINES.
         """
+        if engine not in REDACTION_ENGINES:
+            raise ValueError("Unknown redaction engine: {}".format(engine))
         super().__init__(self.FORMAT)
         self.fields = fields
+        self.engine = engine
+        self._redact = REDACTION_ENGINES[engine](
+            tuple(fields), self.REDACTION, self.SEPARATOR)
+        self._row_templates = {}
+
+    def row_template(self, columns: Sequence[str]) -> str:
+        """
+        Returns the message template for rows with the given columns.
+
+        PII columns are replaced by the redaction once, when the template
+        is first built for a column layout.
+
+        Args:
+            columns: Column names, in row order.
+
+        Returns:
+            A str.format template taking the row values positionally.
+        """
+        columns = tuple(columns)
+        template = self._row_templates.get(columns)
+        if template is None:
+            template = _row_template(columns, self.fields, self.REDACTION)
+            self._row_templates[columns] = template
+        return template
 
     def format(self, record: logging.LogRecord) -> str:
         """
         Formats the log record, redacting specified fields.
 
+        Structured records (see log_row) are rendered from their values
+        with PII columns masked by position, skipping the regex pass.
+
         Args:
             record: The log record to format.
 
         Returns:
             The formatted and redacted log message.
         """
-        original = super().format(record)
-        return filter_datum(self.fields, self.REDACTION, original, self.SEPARATOR)
+        if not hasattr(record, "row_columns"):
+            original = super().format(record)
+            return self._redact(original)
+
+        msg, args = record.msg, record.args
+        columns = record.row_columns
+        if isinstance(args, Mapping):
+            columns = columns or tuple(args)
+            values = [args[column] for column in columns]
+        else:
+            values = args[0]
+        record.msg = self.row_template(columns).format(*map(str, values))
+        record.args = None
+        try:
+            return super().format(record)
+        finally:
+            record.msg, record.args = msg, args
 
 
-def get_logger() -> logging.Logger:
+class BoundedQueueHandler(logging.handlers.QueueHandler):
+    """
+    QueueHandler over a bounded queue with a configurable overflow policy.
+
+    "block" waits for room, "drop" discards records while the queue is full
+    and "sample" keeps one in every sample_rate overflowing records.
+    Closing the handler stops its listener, which drains the queue first;
+    records emitted after that are dropped, as nothing would consume them.
+    """
+
+    def __init__(self, log_queue: queue.Queue, overflow: str = "block",
+                 sample_rate: int = OVERFLOW_SAMPLE_RATE):
+        """
+        Initializes the handler.
+
+        Args:
+            log_queue: Bounded queue shared with the listener.
+            overflow: One of OVERFLOW_POLICIES.
+            sample_rate: Keep one in sample_rate records when sampling.
+        """
+        if overflow not in OVERFLOW_POLICIES:
+            raise ValueError("Unknown overflow policy: {}".format(overflow))
+        super().__init__(log_queue)
+        self.overflow = overflow
+        self.sample_rate = max(1, sample_rate)
+        self.dropped = 0
+        self.listener = None
+        self.closed = False
+        self._overflowed = 0
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        """
+        Prepares a record for the queue.
+
+        Structured rows keep their values so the listener can mask them by
+        column; other records are rendered as usual.
+
+        Args:
+            record: The log record to prepare.
+
+        Returns:
+            The record to enqueue.
+        """
+        if hasattr(record, "row_columns"):
+            return record
+        return super().prepare(record)
+
+    def enqueue(self, record: logging.LogRecord):
+        """
+        Enqueues a record according to the overflow policy.
+
+        Args:
+            record: The prepared log record.
+        """
+        if self.closed:
+            self.dropped += 1
+            return
+        if self.overflow == "block":
+            self.queue.put(record)
+            return
+        try:
+            self.queue.put_nowait(record)
+            return
+        except queue.Full:
+            self._overflowed += 1
+        if self.overflow == "sample" and \
+                self._overflowed % self.sample_rate == 0:
+            self.queue.put(record)
+        else:
+            self.dropped += 1
+
+    def close(self):
+        """
+        Stops the listener, flushing every queued record, then closes.
+        """
+        self.closed = True
+        listener, self.listener = self.listener, None
+        if listener is not None:
+            listener.stop()
+        super().close()
+
+
+class RedactingQueueListener(logging.handlers.QueueListener):
+    """
+    QueueListener that redacts on its own thread and batches stream flushes.
+
+    Handlers are flushed only once the queue has drained, so a burst of
+    records costs a single flush.
+    """
+
+    def handle(self, record: logging.LogRecord):
+        """
+        Handles a record and flushes the handlers when the queue is empty.
+
+        Args:
+            record: The log record to handle.
+        """
+        super().handle(record)
+        if self.queue.empty():
+            for handler in self.handlers:
+                handler.flush()
+
+    def enqueue_sentinel(self):
+        """
+        Enqueues the stop sentinel, waiting for room if the queue is full.
+        """
+        self.queue.put(self._sentinel)
+
+
+class _DeferredFlushStreamHandler(logging.StreamHandler):
+    """
+    StreamHandler whose writes are flushed by RedactingQueueListener.
+    """
+
+    def emit(self, record: logging.LogRecord):
+        """
+        Writes a formatted record without flushing the stream.
+
+        Args:
+            record: The log record to write.
+        """
+        try:
+            self.stream.write(self.format(record) + self.terminator)
+        except Exception:
+            self.handleError(record)
+
+
+def close_handlers(logger: logging.Logger):
+    """
+    Detaches and closes every handler of a logger.
+
+    Asynchronous handlers flush their queue before their listener stops.
+
+    Args:
+        logger: Logger to clear.
+    """
+    for handler in list(logger.handlers):
+        logger.removeHandler(handler)
+        handler.close()
+
+
+def get_logger(engine: str = "regex", asynchronous: bool = False,
+               queue_size: int = LOG_QUEUE_SIZE,
+               overflow: str = "block") -> logging.Logger:
     """
     Configures and returns a logger with redaction capabilities.
 
+    When asynchronous is set, the logger only enqueues records; a
+    background RedactingQueueListener formats, redacts and writes them.
+    Pending records are flushed when the handlers are closed, which
+    logging.shutdown() does at interpreter exit. The handlers of a previous
+    call are closed and replaced, so the logger never writes lines twice.
+
+    Args:
+        engine: Redaction engine used by the formatter ("regex" or "scan").
+        asynchronous: Whether to log through a bounded queue.
+        queue_size: Maximum number of queued records.
+        overflow: Policy when the queue is full, one of OVERFLOW_POLICIES.
+
     Returns:
         Configured logger instance.
     """
     logger = logging.getLogger("user_data")
     logger.setLevel(logging.INFO)
     logger.propagate = False
+    close_handlers(logger)
+
+    formatter = RedactingFormatter(fields=list(PII_FIELDS), engine=engine)
+    if not asynchronous:
+        stream_handler = logging.StreamHandler()
+        stream_handler.setFormatter(formatter)
+        logger.addHandler(stream_handler)
+        return logger
 
-    stream_handler = logging.StreamHandler()
-    formatter = RedactingFormatter(fields=list(PII_FIELDS))
+    stream_handler = _DeferredFlushStreamHandler()
     stream_handler.setFormatter(formatter)
+    queue_handler = BoundedQueueHandler(
+        queue.Queue(maxsize=queue_size), overflow=overflow)
+    queue_handler.listener = RedactingQueueListener(
+        queue_handler.queue, stream_handler, respect_handler_level=True)
+    queue_handler.listener.start()
 
-    logger.addHandler(stream_handler)
+    logger.addHandler(queue_handler)
 
     return logger
 
 
+def _env_int(name: str, default: int) -> int:
+    """
+    Reads a positive integer setting from the environment.
+
+    Args:
+        name: Environment variable name.
+        default: Value used when the variable is unset, invalid or not
+            positive.
+
+    Returns:
+        The configured integer.
+    """
+    try:
+        value = int(os.getenv(name, default))
+    except (ValueError, TypeError):
+        return default
+    return value if value > 0 else default
+
+
 def get_db() -> mysql.connector.connection.MySQLConnection:
     """
     Establishes and returns a connection to the MySQL database.
@@ -100,25 +443,289 @@ def get_db() -> mysql.connector.connection.MySQLConnection:
     )
 
 
+class ConnectionPool:
+    """
+    Fixed-size pool of database connections.
+
+    Connections are opened lazily up to size and reused afterwards; once
+    the pool is exhausted borrowers wait up to timeout seconds. Waits and
+    time spent waiting are tracked so the pool can be sized.
+    """
+
+    def __init__(self, connect: Callable = get_db,
+                 size: int = DEFAULT_POOL_SIZE,
+                 timeout: float = DEFAULT_POOL_TIMEOUT):
+        """
+        Initializes an empty pool.
+
+        Args:
+            connect: Callable returning a new connection.
+            size: Maximum number of open connections.
+            timeout: Seconds to wait for a free connection.
+        """
+        self.connect = connect
+        self.size = size
+        self.timeout = timeout
+        self._idle = queue.LifoQueue()
+        self._lock = threading.Lock()
+        self._opened = 0
+        self._in_use = 0
+        self._waits = 0
+        self._wait_time = 0.0
+
+    def acquire(self):
+        """
+        Borrows a connection, opening one if the pool is not full.
+
+        Returns:
+            A connection to hand back with release().
+
+        Raises:
+            TimeoutError: If no connection frees up within timeout.
+        """
+        with self._lock:
+            opening = self._idle.empty() and self._opened < self.size
+            if opening:
+                self._opened += 1
+
+        if not opening:
+            try:
+                db = self._idle.get_nowait()
+            except queue.Empty:
+                db = self._wait()
+        if opening or db is None:
+            try:
+                db = self.connect()
+            except Exception:
+                self._idle.put(None)
+                raise
+        with self._lock:
+            self._in_use += 1
+        return db
+
+    def _wait(self):
+        """
+        Blocks until a connection is released, recording the wait.
+
+        Returns:
+            The released connection.
+
+        Raises:
+            TimeoutError: If no connection frees up within timeout.
+        """
+        began = time.perf_counter()
+        try:
+            return self._idle.get(timeout=self.timeout)
+        except queue.Empty:
+            raise TimeoutError(
+                "No connection available after {}s".format(self.timeout))
+        finally:
+            with self._lock:
+                self._waits += 1
+                self._wait_time += time.perf_counter() - began
+
+    def release(self, db, discard: bool = False):
+        """
+        Returns a borrowed connection to the pool.
+
+        A discarded connection leaves an empty slot behind, which the next
+        borrower fills with a fresh connection.
+
+        Args:
+            db: Connection obtained from acquire().
+            discard: Close the connection instead of reusing it.
+        """
+        is_connected = getattr(db, "is_connected", None)
+        if is_connected is not None and not discard:
+            discard = not is_connected()
+        with self._lock:
+            self._in_use -= 1
+        if discard:
+            try:
+                db.close()
+            except Exception:
+                pass
+            db = None
+        self._idle.put(db)
+
+    @contextmanager
+    def connection(self):
+        """
+        Borrows a connection for the duration of a with block.
+
+        The connection is discarded rather than reused if the block raises.
+
+        Yields:
+            A pooled connection.
+        """
+        db = self.acquire()
+        try:
+            yield db
+        except BaseException:
+            self.release(db, discard=True)
+            raise
+        self.release(db)
+
+    def stats(self) -> Dict[str, float]:
+        """
+        Reports pool usage.
+
+        Returns:
+            Dictionary with size, open, in_use, idle, waits and wait_time.
+        """
+        with self._lock:
+            return {
+                "size": self.size,
+                "open": self._opened,
+                "in_use": self._in_use,
+                "idle": self._opened - self._in_use,
+                "waits": self._waits,
+                "wait_time": self._wait_time,
+            }
+
+    def close(self):
+        """
+        Closes every idle connection.
+        """
+        while True:
+            try:
+                db = self._idle.get_nowait()
+            except queue.Empty:
+                return
+            with self._lock:
+                self._opened -= 1
+            if db is not None:
+                db.close()
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def get_pool() -> ConnectionPool:
+    """
+    Returns the module-wide connection pool, creating it on first use.
+
+    PERSONAL_DATA_DB_POOL_SIZE and PERSONAL_DATA_DB_POOL_TIMEOUT configure
+    the pool; connections are opened with get_db().
+
+    Returns:
+        The shared ConnectionPool.
+    """
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = ConnectionPool(
+                size=_env_int("PERSONAL_DATA_DB_POOL_SIZE",
+                              DEFAULT_POOL_SIZE),
+                timeout=_env_int("PERSONAL_DATA_DB_POOL_TIMEOUT",
+                                 DEFAULT_POOL_TIMEOUT))
+        return _pool
+
+
+def iter_batches(cursor, batch_size: int) -> Iterator[List[tuple]]:
+    """
+    Streams rows from an executed cursor in fixed-size batches.
+
+    Args:
+        cursor: Cursor with a pending result set.
+        batch_size: Maximum number of rows fetched per round trip.
+
+    Yields:
+        Lists of at most batch_size rows until the result set is exhausted.
+    """
+    while True:
+        rows = cursor.fetchmany(batch_size)
+        if not rows:
+            return
+        yield rows
+
+
+def _row_template(columns: Sequence[str], fields: Sequence[str],
+                  redaction: str) -> str:
+    """
+    Builds a "column={0}; ...;" template for rows with the given columns.
+
+    A column is masked when its name ends with one of fields, as the
+    regex engines mask any "...<field>=" key (e.g. "user_email").
+
+    Args:
+        columns: Column names, in row order.
+        fields: Field names to redact.
+        redaction: String to show for masked columns.
+
+    Returns:
+        A str.format template taking the row values positionally.
+    """
+    def escape(text: str) -> str:
+        """
+        Escapes braces so text is kept literally by str.format.
+        """
+        return text.replace("{", "{{").replace("}", "}}")
+
+    def masked(column: str) -> bool:
+        """
+        Tells whether the value of column is PII.
+        """
+        return any(column.endswith(field) for field in fields)
+
+    return "; ".join(
+        "{}={}".format(escape(column), escape(redaction) if masked(column)
+                       else "{{{}}}".format(index))
+        for index, column in enumerate(columns)) + ";"
+
+
+def log_row(logger: logging.Logger, columns: Sequence[str], row,
+            level: int = logging.INFO):
+    """
+    Logs a row as a structured record instead of a "k=v;" string.
+
+    RedactingFormatter masks PII columns by position and renders the line
+    once, in the same format as a formatted row. The row stays in
+    record.args until then.
+
+    Args:
+        logger: Logger to emit the record on.
+        columns: Column names, in row order; may be None for dict rows.
+        row: Tuple of values, or a dict keyed by column name.
+        level: Logging level.
+    """
+    logger.log(level, "%s", row, extra={"row_columns": columns})
+
+
 def main():
     """
     Main function that retrieves and logs user data with redacted sensitive fields.
+
+    Rows are streamed through an unbuffered cursor in batches of
+    PERSONAL_DATA_DB_BATCH_SIZE, so memory stays flat whatever the table
+    size. PERSONAL_DATA_DB_ROW_LIMIT caps the number of exported rows.
+    Setting PERSONAL_DATA_LOG_ASYNC=1 moves redaction and writes off the
+    read loop onto a queue listener thread.
     """
-    db = get_db()
-    cursor = db.cursor()
-    cursor.execute("SELECT * FROM users;")
-    fields = [i[0] for i in cursor.description]
+    batch_size = _env_int("PERSONAL_DATA_DB_BATCH_SIZE", DEFAULT_BATCH_SIZE)
+    row_limit = _env_int("PERSONAL_DATA_DB_ROW_LIMIT", 0)
+
+    logger = get_logger(
+        asynchronous=os.getenv("PERSONAL_DATA_LOG_ASYNC") == "1")
 
-    logger = get_logger()
+    pool = get_pool()
+    with pool.connection() as db:
+        cursor = db.cursor(buffered=False)
+        if row_limit:
+            cursor.execute("SELECT * FROM users LIMIT %s;", (row_limit,))
+        else:
+            cursor.execute("SELECT * FROM users;")
+        fields = [i[0] for i in cursor.description]
 
-    for row in cursor:
-        message = "; ".join(f"{field}={str(value)}" for field, value in zip(fields, row)) + ";"
-        logger.info(message)
+        for rows in iter_batches(cursor, batch_size):
+            for row in rows:
+                log_row(logger, fields, row)
 
-    cursor.close()
-    db.close()
+        cursor.close()
+    pool.close()
+    close_handlers(logger)
 
 
 if __name__ == "__main__":
     main()
-
@@ -0,0 +1,162 @@
+#!/usr/bin/env python3
+"""
+Parallel, partitioned export of redacted user data.
+"""
+
+import logging
+import os
+import shutil
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Callable, List, Tuple
+
+from filtered_logger import (DEFAULT_BATCH_SIZE, PII_FIELDS,
+                             RedactingFormatter, _env_int, get_db,
+                             iter_batches)
+
+PARTITIONS_PER_WORKER = 4
+
+
+def partition_ranges(low: int, high: int,
+                     partitions: int) -> List[Tuple[int, int]]:
+    """
+    Splits the inclusive key range [low, high] into half-open ranges.
+
+    Args:
+        low: Smallest key in the table.
+        high: Largest key in the table.
+        partitions: Requested number of ranges.
+
+    Returns:
+        Contiguous (start, stop) ranges covering every key, in order.
+    """
+    span = high - low + 1
+    partitions = max(1, min(partitions, span))
+    step, extra = divmod(span, partitions)
+    ranges = []
+    start = low
+    for index in range(partitions):
+        stop = start + step + (1 if index < extra else 0)
+        ranges.append((start, stop))
+        start = stop
+    return ranges
+
+
+def export_partition(connect: Callable, key: str, start: int, stop: int,
+                     path: str, batch_size: int) -> Tuple[int, float]:
+    """
+    Exports the rows with start <= key < stop to a redacted log file.
+
+    Runs in a worker process with its own connection and formatter.
+
+    Args:
+        connect: Picklable callable returning a DB-API connection.
+        key: Integer primary-key column used for partitioning.
+        start: First key of the partition.
+        stop: Key following the last key of the partition.
+        path: File the redacted lines are written to.
+        batch_size: Maximum number of rows fetched per round trip.
+
+    Returns:
+        Tuple of (rows written, seconds spent).
+    """
+    began = time.perf_counter()
+    formatter = RedactingFormatter(fields=list(PII_FIELDS))
+    db = connect()
+    cursor = db.cursor()
+    cursor.execute(
+        "SELECT * FROM users WHERE {0} >= {1:d} AND {0} < {2:d} "
+        "ORDER BY {0};".format(key, start, stop))
+    fields = [i[0] for i in cursor.description]
+
+    rows = 0
+    with open(path, "w") as output:
+        for batch in iter_batches(cursor, batch_size):
+            for row in batch:
+                record = logging.LogRecord("user_data", logging.INFO,
+                                           __file__, 0, "%s", (row,), None)
+                record.row_columns = fields
+                output.write(formatter.format(record) + "\n")
+            rows += len(batch)
+
+    cursor.close()
+    db.close()
+    return rows, time.perf_counter() - began
+
+
+def parallel_export(output_path: str, workers: int = None,
+                    connect: Callable = get_db, key: str = "id",
+                    batch_size: int = DEFAULT_BATCH_SIZE) -> int:
+    """
+    Exports the users table in parallel, one key range per task.
+
+    Partition files are written next to output_path, merged into it in
+    key order and removed. Per-partition throughput is printed to stderr.
+
+    Args:
+        output_path: File receiving the merged export.
+        workers: Number of worker processes, defaults to the CPU count.
+        connect: Picklable callable returning a DB-API connection.
+        key: Integer primary-key column used for partitioning.
+        batch_size: Maximum number of rows fetched per round trip.
+
+    Returns:
+        Total number of exported rows.
+    """
+    workers = workers or os.cpu_count() or 1
+    db = connect()
+    cursor = db.cursor()
+    cursor.execute("SELECT MIN({0}), MAX({0}) FROM users;".format(key))
+    low, high = cursor.fetchone()
+    cursor.close()
+    db.close()
+    if low is None:
+        open(output_path, "w").close()
+        return 0
+
+    ranges = partition_ranges(int(low), int(high),
+                              workers * PARTITIONS_PER_WORKER)
+    paths = ["{}.part{:04d}".format(output_path, index)
+             for index in range(len(ranges))]
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        futures = [executor.submit(export_partition, connect, key, start,
+                                   stop, path, batch_size)
+                   for (start, stop), path in zip(ranges, paths)]
+        results = [future.result() for future in futures]
+
+    total = 0
+    with open(output_path, "w") as output:
+        for index, path in enumerate(paths):
+            rows, seconds = results[index]
+            total += rows
+            print("partition {} [{}, {}): {} rows, {:.0f} rows/s".format(
+                index, ranges[index][0], ranges[index][1], rows,
+                rows / seconds if seconds else 0), file=sys.stderr)
+            with open(path, "r") as part:
+                shutil.copyfileobj(part, output)
+            os.remove(path)
+    return total
+
+
+def main():
+    """
+    Runs a parallel export configured through the environment.
+
+    PERSONAL_DATA_EXPORT_WORKERS sets the worker count and
+    PERSONAL_DATA_DB_KEY the partitioning column; the output file is the
+    first command-line argument.
+    """
+    output_path = sys.argv[1] if len(sys.argv) > 1 else "users_export.log"
+    workers = _env_int("PERSONAL_DATA_EXPORT_WORKERS", os.cpu_count() or 1)
+    batch_size = _env_int("PERSONAL_DATA_DB_BATCH_SIZE", DEFAULT_BATCH_SIZE)
+    key = os.getenv("PERSONAL_DATA_DB_KEY", "id")
+    began = time.perf_counter()
+    total = parallel_export(output_path, workers=workers, key=key,
+                            batch_size=batch_size)
+    print("exported {} rows in {:.2f}s".format(
+        total, time.perf_counter() - began), file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
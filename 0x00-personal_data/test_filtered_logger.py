@@ -0,0 +1,106 @@
+#!/usr/bin/env python3
+"""
+Tests of the redaction helpers of filtered_logger.
+"""
+
+import logging
+import random
+
+import pytest
+
+from filtered_logger import (PII_FIELDS, RedactingFormatter, close_handlers,
+                             filter_datum, filter_datum_scan, get_logger)
+
+SEPARATORS = (";", ",", "&", ":")
+ALPHABET = "ab=;,&: \n" + "".join(PII_FIELDS)
+CASES = 5000
+
+
+def random_message(rng: random.Random, separator: str) -> str:
+    """
+    Builds a message mixing PII and other fields with noisy values.
+
+    Values may contain "=", other separators, newlines and field names,
+    and the last field may miss its separator.
+    """
+    fields = []
+    for _ in range(rng.randint(0, 8)):
+        name = rng.choice(PII_FIELDS + ("id", "date", "first_name",
+                                        "user_email", ""))
+        value = "".join(rng.choice(ALPHABET)
+                        for _ in range(rng.randint(0, 12)))
+        fields.append("{}={}".format(name, value))
+    message = separator.join(fields)
+    if fields and rng.random() < 0.8:
+        message += separator
+    return message
+
+
+@pytest.mark.parametrize("separator", SEPARATORS)
+def test_scan_matches_regex(separator):
+    """
+    filter_datum_scan returns exactly what filter_datum returns.
+
+    Both are only specified for non-empty fields and literal separators.
+    """
+    rng = random.Random(separator)
+    for _ in range(CASES):
+        fields = rng.sample(PII_FIELDS, rng.randint(1, len(PII_FIELDS)))
+        redaction = rng.choice(("***", "", "x" * rng.randint(1, 4)))
+        message = random_message(rng, separator)
+        assert filter_datum_scan(fields, redaction, message, separator) == \
+            filter_datum(fields, redaction, message, separator), message
+
+
+def test_scan_masks_pii():
+    """
+    Known message from the task description.
+    """
+    message = "name=egg;email=eggmin@eggsample.com;password=eggcellent;" \
+              "date_of_birth=12/12/1986;"
+    assert filter_datum_scan(["password", "date_of_birth"], "xxx",
+                             message, ";") == \
+        "name=egg;email=eggmin@eggsample.com;password=xxx;" \
+        "date_of_birth=xxx;"
+
+
+@pytest.mark.parametrize("engine", ("regex", "scan"))
+def test_row_masks_like_message(engine):
+    """
+    Structured rows are masked like the same row formatted as a message,
+    including columns that only end with a PII field name.
+    """
+    columns = ("name", "first_name", "user_email", "ssn", "ip", "id")
+    row = ("Bob", "Bob", "bob@dylan.com", "123", "1.2.3.4", 5)
+    formatter = RedactingFormatter(list(PII_FIELDS), engine)
+    structured = logging.LogRecord("user_data", logging.INFO, None, None,
+                                   "%s", (row,), None)
+    structured.row_columns = columns
+    message = logging.LogRecord(
+        "user_data", logging.INFO, None, None,
+        "; ".join("{}={}".format(*item) for item in zip(columns, row)) + ";",
+        None, None)
+    message.created = structured.created
+    message.msecs = structured.msecs
+    assert formatter.format(structured) == formatter.format(message)
+    assert "bob" not in formatter.format(structured).lower()
+
+
+def test_get_logger_twice_does_not_block():
+    """
+    A closed asynchronous handler drops records instead of blocking, and
+    get_logger replaces the handlers of a previous call.
+    """
+    logger = get_logger(asynchronous=True, queue_size=2)
+    old = logger.handlers[0]
+    old.close()
+    for _ in range(5):
+        logger.info("name=Bob;")
+    assert old.dropped == 5
+
+    logger = get_logger(asynchronous=True, queue_size=2)
+    assert logger.handlers != [old] and len(logger.handlers) == 1
+    for _ in range(5):
+        logger.info("name=Bob;")
+    close_handlers(logger)
+    assert logger.handlers == []
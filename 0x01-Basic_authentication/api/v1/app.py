@@ -4,6 +4,7 @@ Route module for the API
 """
 from os import getenv
 from api.v1.views import app_views
+from api.v1.auth.auth import PathMatcher
 from flask import Flask, jsonify, abort, request
 from flask_cors import (CORS, cross_origin)
 import os
@@ -22,6 +23,9 @@ elif AUTH_TYPE == 'basic_auth':
     from api.v1.auth.basic_auth import BasicAuth
     auth = BasicAuth()
 
+EXCLUDED_PATHS = PathMatcher(
+    ['/api/v1/status/', '/api/v1/unauthorized/', '/api/v1/forbidden/'])
+
 
 @app.before_request
 def before_request():
@@ -29,9 +33,7 @@ def before_request():
     if auth is None:
         return
     
-    excluded_paths = ['/api/v1/status/', '/api/v1/unauthorized/', '/api/v1/forbidden/']
-    
-    if not auth.require_auth(request.path, excluded_paths):
+    if not auth.require_auth(request.path, EXCLUDED_PATHS):
         return
     
     if auth.authorization_header(request) is None:
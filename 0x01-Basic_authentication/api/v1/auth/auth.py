@@ -3,18 +3,83 @@
 Auth class
 """
 from flask import request
-from typing import List, TypeVar
+from functools import lru_cache
+from typing import List, TypeVar, Union
+
+
+class PathMatcher:
+    """Excluded paths compiled for fast matching
+
+    Exact paths are kept in a set and wildcard paths (ending with '*')
+    in a character trie of their prefixes, so matching a path costs one
+    set lookup plus one step per character, whatever the number of rules
+    """
+
+    END = None
+
+    def __init__(self, excluded_paths: List[str]):
+        """Compiles the excluded paths
+
+        Args:
+            excluded_paths: Exact paths, or prefixes followed by '*'
+        """
+        self.exact = set()
+        self.prefixes = {}
+        self.prefix_count = 0
+        for excluded_path in excluded_paths:
+            if excluded_path.endswith('*'):
+                node = self.prefixes
+                for char in excluded_path[:-1]:
+                    node = node.setdefault(char, {})
+                if self.END not in node:
+                    node[self.END] = True
+                    self.prefix_count += 1
+            else:
+                self.exact.add(excluded_path)
+
+    def __len__(self) -> int:
+        """Number of distinct rules"""
+        return len(self.exact) + self.prefix_count
+
+    def match(self, path: str) -> bool:
+        """Checks a path against the rules
+
+        Args:
+            path: The path to check, already slash tolerant
+
+        Returns:
+            True if the path is excluded, False otherwise
+        """
+        if path in self.exact:
+            return True
+        node = self.prefixes
+        end = self.END
+        for char in path:
+            if end in node:
+                return True
+            node = node.get(char)
+            if node is None:
+                return False
+        return end in node
+
+
+@lru_cache(maxsize=32)
+def _compile(excluded_paths: tuple) -> PathMatcher:
+    """Compiles and caches a tuple of excluded paths"""
+    return PathMatcher(excluded_paths)
 
 
 class Auth:
     """Template for all authentication system"""
 
-    def require_auth(self, path: str, excluded_paths: List[str]) -> bool:
+    def require_auth(self, path: str,
+                     excluded_paths: Union[List[str], PathMatcher]) -> bool:
         """Determines if authentication is required for a given path
         
         Args:
             path: The path to check
-            excluded_paths: List of paths that don't require authentication
+            excluded_paths: Paths that don't require authentication, as a
+                list or compiled once into a PathMatcher
             
         Returns:
             True if authentication is required, False otherwise
@@ -25,21 +90,14 @@ class Auth:
         if excluded_paths is None or len(excluded_paths) == 0:
             return True
         
+        if not isinstance(excluded_paths, PathMatcher):
+            excluded_paths = _compile(tuple(excluded_paths))
+        
         # Make path slash tolerant
         if not path.endswith('/'):
             path += '/'
         
-        # Check for wildcard patterns
-        for excluded_path in excluded_paths:
-            if excluded_path.endswith('*'):
-                # Remove the * and check if path starts with the prefix
-                prefix = excluded_path[:-1]
-                if path.startswith(prefix):
-                    return False
-            elif path == excluded_path:
-                return False
-        
-        return True
+        return not excluded_paths.match(path)
 
     def authorization_header(self, request=None) -> str:
         """Gets the authorization header from the request
@@ -0,0 +1,60 @@
+#!/usr/bin/env python3
+""" Benchmark of Auth.require_auth with many excluded paths
+
+Usage: ./benchmark.py [max_rules]
+"""
+import sys
+import time
+from api.v1.auth.auth import Auth, PathMatcher
+
+
+CALLS = 20000
+
+
+def legacy_require_auth(path: str, excluded_paths: list) -> bool:
+    """ require_auth before excluded paths were compiled
+    """
+    if not path.endswith('/'):
+        path += '/'
+    for excluded_path in excluded_paths:
+        if excluded_path.endswith('*'):
+            if path.startswith(excluded_path[:-1]):
+                return False
+        elif path == excluded_path:
+            return False
+    return True
+
+
+def rules(count: int) -> list:
+    """ `count` excluded paths, half exact and half wildcard
+    """
+    return ["/api/v1/public{}/{}".format(i, "*" if i % 2 else "")
+            for i in range(count)]
+
+
+def per_call(func) -> float:
+    """ Average duration of func() in microseconds
+    """
+    start = time.perf_counter()
+    for _ in range(CALLS):
+        func()
+    return (time.perf_counter() - start) / CALLS * 1e6
+
+
+if __name__ == "__main__":
+    max_rules = int(sys.argv[1]) if len(sys.argv) > 1 else 1000
+    auth = Auth()
+    count = 10
+    while count <= max_rules:
+        excluded_paths = rules(count)
+        matcher = PathMatcher(excluded_paths)
+        for path in ("/api/v1/users", "/api/v1/public{}/x".format(count - 1)):
+            print("{:>6,} rules {:<24} legacy {:>8.2f}us, list {:>8.2f}us, "
+                  "compiled {:>6.2f}us".format(
+                      count, path,
+                      per_call(lambda: legacy_require_auth(
+                          path, excluded_paths)),
+                      per_call(lambda: auth.require_auth(
+                          path, excluded_paths)),
+                      per_call(lambda: auth.require_auth(path, matcher))))
+        count *= 10
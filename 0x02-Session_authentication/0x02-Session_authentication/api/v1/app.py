@@ -8,6 +8,7 @@ from flask import Flask, jsonify, abort, request
 from flask_cors import (CORS, cross_origin)
 
 from api.v1.views import app_views
+from api.v1.auth.auth import PathMatcher
 
 
 app = Flask(__name__)
@@ -29,10 +30,24 @@ elif auth_type == 'session_exp_auth':
 elif auth_type == 'session_db_auth':
     from api.v1.auth.session_db_auth import SessionDBAuth
     auth = SessionDBAuth()
+elif auth_type == 'session_token_auth':
+    from api.v1.auth.session_token_auth import SessionTokenAuth
+    auth = SessionTokenAuth()
 else:
     from api.v1.auth.auth import Auth
     auth = Auth()
 
+# Views reach auth through the app: under `python3 -m api.v1.app` this
+# module is __main__ and `from api.v1.app import auth` would build another
+app.config['AUTH'] = auth
+
+EXCLUDED_PATHS = PathMatcher([
+    '/api/v1/status/',
+    '/api/v1/unauthorized/',
+    '/api/v1/forbidden/',
+    '/api/v1/auth_session/login/'
+])
+
 
 @app.before_request
 def before_request():
@@ -42,23 +57,17 @@ def before_request():
     if auth is None:
         return
     
-    excluded_paths = [
-        '/api/v1/status/',
-        '/api/v1/unauthorized/',
-        '/api/v1/forbidden/',
-        '/api/v1/auth_session/login/'
-    ]
-    
-    if not auth.require_auth(request.path, excluded_paths):
+    if not auth.require_auth(request.path, EXCLUDED_PATHS):
         return
     
     if auth.authorization_header(request) is None and auth.session_cookie(request) is None:
         abort(401)
     
-    if auth.current_user(request) is None:
+    user = auth.request_user(request)
+    if user is None:
         abort(403)
     
-    request.current_user = auth.current_user(request)
+    request.current_user = user
 
 
 @app.errorhandler(404)
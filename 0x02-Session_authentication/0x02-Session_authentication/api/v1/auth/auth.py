@@ -0,0 +1,163 @@
+#!/usr/bin/env python3
+"""
+Auth class
+"""
+from os import getenv
+from flask import request
+from functools import lru_cache
+from typing import List, TypeVar, Union
+
+# WSGI environ key under which request_user() keeps the current user
+REQUEST_USER_KEY = "api.auth.current_user"
+
+
+class PathMatcher:
+    """Excluded paths compiled for fast matching
+
+    Exact paths are kept in a set and wildcard paths (ending with '*')
+    in a character trie of their prefixes, so matching a path costs one
+    set lookup plus one step per character, whatever the number of rules
+    """
+
+    END = None
+
+    def __init__(self, excluded_paths: List[str]):
+        """Compiles the excluded paths
+
+        Args:
+            excluded_paths: Exact paths, or prefixes followed by '*'
+        """
+        self.exact = set()
+        self.prefixes = {}
+        self.prefix_count = 0
+        for excluded_path in excluded_paths:
+            if excluded_path.endswith('*'):
+                node = self.prefixes
+                for char in excluded_path[:-1]:
+                    node = node.setdefault(char, {})
+                if self.END not in node:
+                    node[self.END] = True
+                    self.prefix_count += 1
+            else:
+                self.exact.add(excluded_path)
+
+    def __len__(self) -> int:
+        """Number of distinct rules"""
+        return len(self.exact) + self.prefix_count
+
+    def match(self, path: str) -> bool:
+        """Checks a path against the rules
+
+        Args:
+            path: The path to check, already slash tolerant
+
+        Returns:
+            True if the path is excluded, False otherwise
+        """
+        if path in self.exact:
+            return True
+        node = self.prefixes
+        end = self.END
+        for char in path:
+            if end in node:
+                return True
+            node = node.get(char)
+            if node is None:
+                return False
+        return end in node
+
+
+@lru_cache(maxsize=32)
+def _compile(excluded_paths: tuple) -> PathMatcher:
+    """Compiles and caches a tuple of excluded paths"""
+    return PathMatcher(excluded_paths)
+
+
+class Auth:
+    """Template for all authentication system"""
+
+    def require_auth(self, path: str,
+                     excluded_paths: Union[List[str], PathMatcher]) -> bool:
+        """Determines if authentication is required for a given path
+        
+        Args:
+            path: The path to check
+            excluded_paths: Paths that don't require authentication, as a
+                list or compiled once into a PathMatcher
+            
+        Returns:
+            True if authentication is required, False otherwise
+        """
+        if path is None:
+            return True
+        
+        if excluded_paths is None or len(excluded_paths) == 0:
+            return True
+        
+        if not isinstance(excluded_paths, PathMatcher):
+            excluded_paths = _compile(tuple(excluded_paths))
+        
+        # Make path slash tolerant
+        if not path.endswith('/'):
+            path += '/'
+        
+        return not excluded_paths.match(path)
+
+    def authorization_header(self, request=None) -> str:
+        """Gets the authorization header from the request
+        
+        Args:
+            request: Flask request object
+            
+        Returns:
+            The authorization header value or None
+        """
+        if request is None:
+            return None
+        
+        return request.headers.get('Authorization')
+
+    def session_cookie(self, request=None) -> str:
+        """Gets the session cookie from the request
+        
+        Args:
+            request: Flask request object
+            
+        Returns:
+            The value of the cookie named SESSION_NAME or None
+        """
+        if request is None:
+            return None
+        
+        return request.cookies.get(getenv('SESSION_NAME'))
+
+    def current_user(self, request=None) -> TypeVar('User'):
+        """Gets the current user from the request
+        
+        Args:
+            request: Flask request object
+            
+        Returns:
+            User object or None
+        """
+        return None
+
+    def request_user(self, request=None) -> TypeVar('User'):
+        """Gets the current user, resolving it at most once per request
+        
+        The result of current_user() is memoized in the WSGI environ of
+        the request, which lives exactly as long as the request itself
+        
+        Args:
+            request: Flask request object
+            
+        Returns:
+            User object or None
+        """
+        environ = getattr(request, "environ", None)
+        if environ is None:
+            return self.current_user(request)
+        
+        if REQUEST_USER_KEY not in environ:
+            environ[REQUEST_USER_KEY] = self.current_user(request)
+        return environ[REQUEST_USER_KEY]
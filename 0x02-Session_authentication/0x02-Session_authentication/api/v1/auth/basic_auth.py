@@ -3,16 +3,114 @@
 Basic authentication module
 """
 import base64
+import hmac
+import os
+import threading
+import time
+from collections import OrderedDict
 from typing import TypeVar
 from api.v1.auth.auth import Auth
 from models.user import User
 
 
+try:
+    CACHE_SIZE = int(os.getenv("BASIC_AUTH_CACHE_SIZE", 1024))
+except (ValueError, TypeError):
+    CACHE_SIZE = 1024
+try:
+    CACHE_TTL = float(os.getenv("BASIC_AUTH_CACHE_TTL", 60.0))
+except (ValueError, TypeError):
+    CACHE_TTL = 60.0
+
+
+class CredentialCache:
+    """
+    Bounded LRU cache of verified Authorization headers, with a TTL
+    
+    Headers are keyed by their HMAC-SHA256 under a random per-process key,
+    so no credential is kept in memory. An entry is only used while its
+    user still has the email and password hash it was verified with, so
+    saving a new password or removing the user invalidates it
+    """
+
+    def __init__(self, size: int = CACHE_SIZE, ttl: float = CACHE_TTL):
+        """
+        Initialize an empty cache of at most `size` headers
+        
+        Args:
+            size: Maximum number of entries, 0 disables the cache
+            ttl: Seconds an entry stays valid
+        """
+        self.size = size
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._key = os.urandom(32)
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def digest(self, authorization_header: str) -> bytes:
+        """
+        Key of an Authorization header
+        """
+        return hmac.digest(self._key, authorization_header.encode(),
+                           "sha256")
+
+    def get(self, digest: bytes) -> TypeVar('User'):
+        """
+        User verified for the header with this digest, or None
+        """
+        entry = self._entries.get(digest)
+        user = None
+        if entry is not None and entry[0] >= time.monotonic():
+            user = User.get(entry[1])
+            if user is not None and (user.email != entry[2] or
+                                     user.password != entry[3]):
+                user = None
+        with self._lock:
+            if user is None:
+                if entry is not None:
+                    self._entries.pop(digest, None)
+                self.misses += 1
+                return None
+            if digest in self._entries:
+                self._entries.move_to_end(digest)
+            self.hits += 1
+        return user
+
+    def put(self, digest: bytes, user: TypeVar('User')):
+        """
+        Remember that the header with this digest authenticates user
+        """
+        with self._lock:
+            self._entries[digest] = (time.monotonic() + self.ttl, user.id,
+                                     user.email, user.password)
+            self._entries.move_to_end(digest)
+            while len(self._entries) > self.size:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def stats(self) -> dict:
+        """
+        Entry count and hit, miss and eviction counters
+        """
+        with self._lock:
+            return {"entries": len(self._entries), "hits": self.hits,
+                    "misses": self.misses, "evictions": self.evictions}
+
+
 class BasicAuth(Auth):
     """
     Basic authentication class
     """
     
+    def __init__(self):
+        """
+        Initialize with an empty credential cache
+        """
+        self.cache = CredentialCache()
+
     def extract_base64_authorization_header(self, authorization_header: str) -> str:
         """
         Extract base64 part of Authorization header for Basic Authentication
@@ -114,6 +212,13 @@ class BasicAuth(Auth):
         if auth_header is None:
             return None
         
+        digest = None
+        if self.cache.size > 0 and isinstance(auth_header, str):
+            digest = self.cache.digest(auth_header)
+            user = self.cache.get(digest)
+            if user is not None:
+                return user
+        
         base64_header = self.extract_base64_authorization_header(auth_header)
         if base64_header is None:
             return None
@@ -126,4 +231,16 @@ class BasicAuth(Auth):
         if user_email is None or user_pwd is None:
             return None
         
-        return self.user_object_from_credentials(user_email, user_pwd)
+        user = self.user_object_from_credentials(user_email, user_pwd)
+        if user is not None and digest is not None:
+            self.cache.put(digest, user)
+        return user
+
+    def cache_stats(self) -> dict:
+        """
+        Counters of the credential cache
+        
+        Returns:
+            Dictionary of entries, hits, misses and evictions
+        """
+        return self.cache.stats()
@@ -3,14 +3,23 @@
 Session authentication with expiration module
 """
 import os
+import threading
 from datetime import datetime, timedelta
 from api.v1.auth.session_auth import SessionAuth
+from api.v1.auth.session_store import SessionStore
 
 
 class SessionExpAuth(SessionAuth):
     """
     Session authentication with expiration
+
+    Sessions live in one SessionStore shared by every instance, created
+    on first use, that evicts expired sessions and keeps at most
+    SESSION_MAX of them (0 for no limit), sweeping every
+    SESSION_SWEEP_INTERVAL seconds
     """
+    _store = None
+    _store_lock = threading.Lock()
     
     def __init__(self):
         """
@@ -23,6 +32,32 @@ class SessionExpAuth(SessionAuth):
             session_duration = 0
         self.session_duration = session_duration
 
+    @property
+    def user_id_by_session_id(self) -> SessionStore:
+        """
+        Session store shared by every instance, created on first use
+        
+        Returns:
+            SessionStore of the sessions by ID
+        """
+        store = SessionExpAuth._store
+        if store is not None:
+            return store
+        with SessionExpAuth._store_lock:
+            if SessionExpAuth._store is None:
+                try:
+                    max_sessions = int(os.getenv('SESSION_MAX', 100000))
+                except (ValueError, TypeError):
+                    max_sessions = 100000
+                try:
+                    sweep_interval = float(
+                        os.getenv('SESSION_SWEEP_INTERVAL', 60))
+                except (ValueError, TypeError):
+                    sweep_interval = 60
+                SessionExpAuth._store = SessionStore(
+                    self.session_duration, max_sessions, sweep_interval)
+            return SessionExpAuth._store
+
     def create_session(self, user_id=None):
         """
         Create a session with expiration data
@@ -72,3 +107,12 @@ class SessionExpAuth(SessionAuth):
             return None
         
         return session_dict.get("user_id")
+
+    def session_stats(self):
+        """
+        Counters of the session store
+        
+        Returns:
+            Dictionary of live, created, expired and evicted counts
+        """
+        return self.user_id_by_session_id.stats()
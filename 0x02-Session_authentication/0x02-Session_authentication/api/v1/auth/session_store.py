@@ -0,0 +1,176 @@
+#!/usr/bin/env python3
+"""
+Bounded, expiring in-memory session store module
+"""
+import heapq
+import threading
+import time
+from collections import OrderedDict
+from collections.abc import MutableMapping
+from datetime import datetime, timedelta
+
+
+class SessionStore(MutableMapping):
+    """
+    Session ID -> session dictionary mapping that forgets old sessions
+
+    Sessions whose "created_at" is older than `duration` seconds are
+    evicted, using a min-heap of expiry dates: a few are swept on every
+    new session, and all of them every `sweep_interval` seconds by a
+    background thread. At most `max_sessions` are kept, the least
+    recently used going first. A duration or cap of 0 disables it
+    """
+
+    def __init__(self, duration: int = 0, max_sessions: int = 0,
+                 sweep_interval: float = 0):
+        """
+        Initialize an empty store
+
+        Args:
+            duration: Session lifetime in seconds
+            max_sessions: Maximum number of live sessions
+            sweep_interval: Seconds between background sweeps
+        """
+        self.duration = duration
+        self.max_sessions = max_sessions
+        self.sweep_interval = sweep_interval
+        self.created = 0
+        self.expired = 0
+        self.evicted = 0
+        self._sessions = OrderedDict()
+        self._expires = {}
+        self._heap = []
+        self._lock = threading.Lock()
+        self._sweeper = None
+
+    def _expiry(self, session) -> datetime:
+        """
+        Expiry date of a session, or None if it never expires
+        """
+        if self.duration <= 0 or not isinstance(session, dict):
+            return None
+        created_at = session.get("created_at")
+        if created_at is None:
+            return None
+        return created_at + timedelta(seconds=self.duration)
+
+    def _drop(self, session_id: str):
+        """
+        Forget a session, with the lock held
+        """
+        self._sessions.pop(session_id, None)
+        self._expires.pop(session_id, None)
+
+    def _sweep(self, now: datetime, limit: int = None) -> int:
+        """
+        Evict up to `limit` expired sessions, with the lock held
+        """
+        count = 0
+        heap = self._heap
+        while heap and heap[0][0] < now and (limit is None or count < limit):
+            expires, session_id = heapq.heappop(heap)
+            if self._expires.get(session_id) == expires:
+                self._drop(session_id)
+                self.expired += 1
+                count += 1
+        if len(heap) > 2 * len(self._expires) + 64:
+            # Drop the entries of replaced and removed sessions
+            self._heap = [(expires, session_id)
+                          for session_id, expires in self._expires.items()
+                          if expires is not None]
+            heapq.heapify(self._heap)
+        return count
+
+    def sweep(self) -> int:
+        """
+        Evict every expired session
+
+        Returns:
+            Number of sessions evicted
+        """
+        with self._lock:
+            return self._sweep(datetime.now())
+
+    def _run(self):
+        """
+        Sweep every sweep_interval seconds
+        """
+        while True:
+            time.sleep(self.sweep_interval)
+            self.sweep()
+
+    def __setitem__(self, session_id: str, session):
+        """
+        Store a session, evicting expired or least recently used ones
+        """
+        expires = self._expiry(session)
+        with self._lock:
+            self._sweep(datetime.now(), 2)
+            if session_id not in self._sessions:
+                self.created += 1
+            self._sessions[session_id] = session
+            self._sessions.move_to_end(session_id)
+            self._expires[session_id] = expires
+            if expires is not None:
+                heapq.heappush(self._heap, (expires, session_id))
+            while 0 < self.max_sessions < len(self._sessions):
+                oldest = next(iter(self._sessions))
+                self._drop(oldest)
+                self.evicted += 1
+            if self.sweep_interval > 0 and self._sweeper is None:
+                self._sweeper = threading.Thread(
+                    target=self._run, name="session-sweeper", daemon=True)
+                self._sweeper.start()
+
+    def __getitem__(self, session_id: str):
+        """
+        Live session by ID, marked as recently used
+
+        Raises:
+            KeyError: if the session does not exist or has expired
+        """
+        with self._lock:
+            session = self._sessions[session_id]
+            expires = self._expires[session_id]
+            if expires is not None and expires < datetime.now():
+                self._drop(session_id)
+                self.expired += 1
+                raise KeyError(session_id)
+            self._sessions.move_to_end(session_id)
+            return session
+
+    def __delitem__(self, session_id: str):
+        """
+        Remove a session
+
+        Raises:
+            KeyError: if the session does not exist
+        """
+        with self._lock:
+            if session_id not in self._sessions:
+                raise KeyError(session_id)
+            self._drop(session_id)
+
+    def __iter__(self):
+        """
+        Iterate over a snapshot of the session IDs
+        """
+        with self._lock:
+            return iter(list(self._sessions))
+
+    def __len__(self) -> int:
+        """
+        Number of stored sessions, expired ones not swept yet included
+        """
+        return len(self._sessions)
+
+    def stats(self) -> dict:
+        """
+        Live sessions and creation and eviction counters
+
+        Returns:
+            Dictionary of live, created, expired and evicted counts
+        """
+        with self._lock:
+            return {"live": len(self._sessions), "created": self.created,
+                    "expired": self.expired, "evicted": self.evicted}
@@ -0,0 +1,161 @@
+#!/usr/bin/env python3
+"""
+Stateless signed session token authentication module
+"""
+import base64
+import hmac
+import json
+import os
+import threading
+import time
+from api.v1.auth.session_auth import SessionAuth
+
+
+class SessionTokenAuth(SessionAuth):
+    """
+    Session authentication with self-contained, HMAC-signed session IDs
+
+    The session cookie carries the user ID, issue time and expiry, signed
+    with SESSION_TOKEN_SECRET, so checking it needs no session store.
+    Without SESSION_TOKEN_SECRET a random key is used, and sessions do not
+    survive a restart nor work across processes. Logged out tokens are
+    kept in a revocation set until they expire. The key and the
+    revocation set are shared by every instance
+    """
+    _secret = None
+    revoked = {}
+    _prune_at = 1024
+    _lock = threading.Lock()
+
+    def __init__(self):
+        """
+        Initialize SessionTokenAuth
+        """
+        super().__init__()
+        try:
+            session_duration = int(os.getenv('SESSION_DURATION', 0))
+        except (ValueError, TypeError):
+            session_duration = 0
+        self.session_duration = session_duration
+
+    @property
+    def secret(self) -> bytes:
+        """
+        Signing key shared by every instance, set on first use from
+        SESSION_TOKEN_SECRET or drawn at random
+        """
+        secret = SessionTokenAuth._secret
+        if secret is not None:
+            return secret
+        with SessionTokenAuth._lock:
+            if SessionTokenAuth._secret is None:
+                secret = os.getenv('SESSION_TOKEN_SECRET')
+                SessionTokenAuth._secret = secret.encode() if secret \
+                    else os.urandom(32)
+            return SessionTokenAuth._secret
+
+    def _sign(self, payload: bytes) -> bytes:
+        """
+        HMAC-SHA256 signature of a token payload
+        """
+        return hmac.digest(self.secret, payload, "sha256")
+
+    def create_session(self, user_id: str = None) -> str:
+        """
+        Create a signed session token for a user_id
+
+        Args:
+            user_id: User ID to create session for
+
+        Returns:
+            Session token string or None
+        """
+        if user_id is None or not isinstance(user_id, str):
+            return None
+
+        issued_at = int(time.time())
+        expires_at = issued_at + self.session_duration \
+            if self.session_duration > 0 else 0
+        payload = json.dumps([user_id, issued_at, expires_at,
+                              os.urandom(8).hex()],
+                             separators=(',', ':')).encode()
+        return ".".join(
+            base64.urlsafe_b64encode(part).decode().rstrip("=")
+            for part in (payload, self._sign(payload)))
+
+    def _verify(self, session_id: str):
+        """
+        Signature and payload of a valid, unexpired token
+
+        Args:
+            session_id: Session token to check
+
+        Returns:
+            Tuple of (signature, [user_id, issued_at, expires_at, nonce])
+            or None
+        """
+        if session_id is None or not isinstance(session_id, str):
+            return None
+
+        try:
+            payload, signature = (
+                base64.urlsafe_b64decode(part + "=" * (-len(part) % 4))
+                for part in session_id.split("."))
+            if not hmac.compare_digest(self._sign(payload), signature):
+                return None
+            claims = json.loads(payload)
+            user_id, issued_at, expires_at = claims[:3]
+        except Exception:
+            return None
+
+        if expires_at and expires_at < time.time():
+            return None
+        if not isinstance(user_id, str):
+            return None
+        return signature, claims
+
+    def user_id_for_session_id(self, session_id: str = None) -> str:
+        """
+        Returns the User ID of a valid, unrevoked session token
+
+        Args:
+            session_id: Session token to check
+
+        Returns:
+            User ID string or None
+        """
+        verified = self._verify(session_id)
+        if verified is None or verified[0] in SessionTokenAuth.revoked:
+            return None
+
+        return verified[1][0]
+
+    def destroy_session(self, request=None) -> bool:
+        """
+        Revoke the session token of the request cookie / logout
+
+        Args:
+            request: Flask request object
+
+        Returns:
+            True if session destroyed, False otherwise
+        """
+        if request is None:
+            return False
+
+        verified = self._verify(self.session_cookie(request))
+        if verified is None or verified[0] in SessionTokenAuth.revoked:
+            return False
+
+        now = time.time()
+        with SessionTokenAuth._lock:
+            revoked = SessionTokenAuth.revoked
+            if len(revoked) >= SessionTokenAuth._prune_at:
+                # Forget revoked tokens that have expired anyway
+                revoked = SessionTokenAuth.revoked = {
+                    signature: expires_at
+                    for signature, expires_at in revoked.items()
+                    if not expires_at or expires_at >= now}
+                SessionTokenAuth._prune_at = max(1024, 2 * len(revoked))
+            revoked[verified[0]] = verified[1][2]
+        return True
@@ -2,7 +2,7 @@
 """
 Module of Index views
 """
-from flask import jsonify, abort
+from flask import jsonify, abort, current_app
 from api.v1.views import app_views
 
 
@@ -22,10 +22,17 @@ def stats() -> str:
     GET /api/v1/stats
     Return:
       - the number of each objects
+      - the credential cache counters under BasicAuth
+      - the session store counters under SessionExpAuth
     """
     from models.user import User
+    auth = current_app.config.get('AUTH')
     stats = {}
     stats['users'] = User.count()
+    if hasattr(auth, "cache_stats"):
+        stats['basic_auth_cache'] = auth.cache_stats()
+    if hasattr(auth, "session_stats"):
+        stats['sessions'] = auth.session_stats()
     return jsonify(stats)
 
 
@@ -2,20 +2,105 @@
 """
 Module of Users views
 """
+import base64
+import json
+from datetime import datetime
 from api.v1.views import app_views
-from flask import abort, jsonify, request
+from flask import Response, abort, jsonify, request
 from models.user import User
 
+STREAM_PAGE_SIZE = 1000
+
+
+def encode_cursor(user: User) -> str:
+    """
+    Opaque pagination cursor pointing after `user`
+    """
+    key = json.dumps([user.created_at.isoformat(), user.id])
+    return base64.urlsafe_b64encode(key.encode()).decode()
+
+
+def decode_cursor(cursor: str) -> tuple:
+    """
+    (created_at, id) key of a cursor, or None if it is malformed
+
+    The date must be naive and the ID a string, as stored keys are
+    """
+    try:
+        created_at, user_id = json.loads(base64.urlsafe_b64decode(cursor))
+        created_at = datetime.fromisoformat(created_at)
+    except Exception:
+        return None
+    if created_at.tzinfo is not None or not isinstance(user_id, str):
+        return None
+    return created_at, user_id
+
+
+def iter_users(page_size: int = STREAM_PAGE_SIZE):
+    """
+    Yield every user in (created_at, id) order, one page at a time
+    """
+    after = None
+    while True:
+        users = User.page(page_size, after)
+        yield from users
+        if len(users) < page_size:
+            return
+        after = (users[-1].created_at, users[-1].id)
+
+
+def stream_users(users) -> str:
+    """
+    Yield a JSON array of users chunk by chunk
+    """
+    yield "["
+    for i, user in enumerate(users):
+        yield ("," if i else "") + json.dumps(user.to_json())
+    yield "]"
+
 
 @app_views.route('/users', methods=['GET'], strict_slashes=False)
 def view_all_users() -> str:
     """
     GET /api/v1/users
+    Query parameters (optional):
+      - limit: page size, ordered by created_at then id
+      - cursor: next_cursor of the previous page
+      - stream: if "1", stream the whole list page by page, ordered
+        by created_at then id
     Return:
       - list of all User objects JSON represented
+      - with limit: {"users": [...], "next_cursor": cursor or null}
+      - 400 if limit or cursor is invalid
     """
-    all_users = [user.to_json() for user in User.all()]
-    return jsonify(all_users)
+    if request.args.get('stream') == "1":
+        return Response(stream_users(iter_users()),
+                        mimetype="application/json")
+
+    limit = request.args.get('limit')
+    if limit is None:
+        all_users = [user.to_json() for user in User.all()]
+        return jsonify(all_users)
+
+    try:
+        limit = int(limit)
+    except ValueError:
+        limit = 0
+    if limit <= 0:
+        return jsonify({'error': "limit must be a positive integer"}), 400
+    after = None
+    if request.args.get('cursor'):
+        after = decode_cursor(request.args.get('cursor'))
+        if after is None:
+            return jsonify({'error': "invalid cursor"}), 400
+
+    users = User.page(limit + 1, after)
+    next_cursor = encode_cursor(users[limit - 1]) \
+        if len(users) > limit else None
+    return jsonify({
+        "users": [user.to_json() for user in users[:limit]],
+        "next_cursor": next_cursor
+    })
 
 
 @app_views.route('/users/<user_id>', methods=['GET'], strict_slashes=False)
@@ -133,3 +218,59 @@ def update_user(user_id: str = None) -> str:
         user.last_name = rj.get('last_name')
     user.save()
     return jsonify(user.to_json()), 200
+
+
+def _bulk_user(rj) -> tuple:
+    """
+    (User, None) built from one item of a bulk create, or (None, error)
+    """
+    if type(rj) is not dict:
+        return None, "Wrong format"
+    if rj.get("email", "") == "":
+        return None, "email missing"
+    if rj.get("password", "") == "":
+        return None, "password missing"
+    try:
+        user = User()
+        user.email = rj.get("email")
+        user.password = rj.get("password")
+        user.first_name = rj.get("first_name")
+        user.last_name = rj.get("last_name")
+        return user, None
+    except Exception as e:
+        return None, "Can't create User: {}".format(e)
+
+
+@app_views.route('/users/bulk', methods=['POST'], strict_slashes=False)
+def bulk_users() -> str:
+    """
+    POST /api/v1/users/bulk
+    JSON body:
+      - create (optional): list of POST /api/v1/users bodies
+      - delete (optional): list of User IDs
+    Return:
+      - {"create": [...], "delete": [...]}, one result per item in order:
+        {"user": User JSON} or {"error": message} for creations,
+        {"id": User ID, "deleted": true or false} for deletions
+      - 400 if the body is not in this format
+    """
+    rj = None
+    try:
+        rj = request.get_json()
+    except Exception as e:
+        rj = None
+    if type(rj) is not dict or \
+            type(rj.get("create", [])) is not list or \
+            type(rj.get("delete", [])) is not list or \
+            any(type(i) is not str for i in rj.get("delete", [])):
+        return jsonify({'error': "Wrong format"}), 400
+
+    created = [_bulk_user(item) for item in rj.get("create", [])]
+    User.save_many(user for user, error in created if user is not None)
+    removed = set(User.remove_many(rj.get("delete", [])))
+    return jsonify({
+        "create": [{"user": user.to_json()} if user is not None
+                   else {"error": error} for user, error in created],
+        "delete": [{"id": user_id, "deleted": user_id in removed}
+                   for user_id in rj.get("delete", [])]
+    })
@@ -0,0 +1,172 @@
+#!/usr/bin/env python3
+""" Benchmark of the models file storage engine
+
+Usage: ./benchmark.py [search|load|memory|json] [max_users]
+"""
+import json
+import multiprocessing
+import os
+import resource
+import sys
+import tempfile
+import time
+import tracemalloc
+from models.engine import storage
+from models.engine.file_storage import DATA
+from models.user import User
+
+
+LOOKUPS = 1000
+
+
+def populate(count: int) -> list:
+    """ Fill the in-memory store with `count` users, without file writes
+    """
+    storage._reset(User)
+    users = []
+    for i in range(count):
+        user = User(email="user{}@hbtn.io".format(i), first_name=str(i))
+        DATA["User"][user.id] = user
+        storage._index(user)
+        users.append(user)
+    return users
+
+
+def per_lookup(func, lookups: int = LOOKUPS) -> float:
+    """ Average duration of func() in microseconds
+    """
+    start = time.perf_counter()
+    for _ in range(lookups):
+        func()
+    return (time.perf_counter() - start) / lookups * 1e6
+
+
+def bench_search(max_users: int):
+    """ User.search cost, indexed (email) vs scan (first_name)
+    """
+    count = 1000
+    while count <= max_users:
+        users = populate(count)
+        target = users[count // 2]
+        indexed = per_lookup(lambda: User.search({"email": target.email}))
+        scan = per_lookup(lambda: User.search(
+            {"first_name": target.first_name}), max(1, LOOKUPS * 1000 // count))
+        print("search {:>9,} users: email (indexed) {:>9.2f}us, "
+              "first_name (scan) {:>12.2f}us".format(count, indexed, scan))
+        count *= 10
+
+
+def _load(directory: str, legacy: bool, results):
+    """ Load .db_User.json from directory in a fresh process
+    """
+    os.chdir(directory)
+    start = time.perf_counter()
+    if legacy:
+        storage._reset(User)
+        with open(".db_User.json", 'r') as f:
+            for obj_id, obj_json in json.load(f).items():
+                DATA["User"][obj_id] = User(**obj_json)
+    else:
+        User.load_from_file()
+    elapsed = time.perf_counter() - start
+    results.put((elapsed, resource.getrusage(resource.RUSAGE_SELF).ru_maxrss))
+
+
+def bench_load(max_users: int):
+    """ Cold start: load time and peak RSS of load_from_file
+    """
+    context = multiprocessing.get_context("spawn")
+    count = 1000
+    while count <= max_users:
+        with tempfile.TemporaryDirectory() as directory:
+            populate(count)
+            cwd = os.getcwd()
+            os.chdir(directory)
+            User.save_to_file()
+            os.chdir(cwd)
+            DATA["User"] = {}
+            for label, legacy in (("bulk", False), ("legacy", True)):
+                results = context.Queue()
+                worker = context.Process(target=_load,
+                                         args=(directory, legacy, results))
+                worker.start()
+                elapsed, rss = results.get()
+                worker.join()
+                print("load {:>9,} users ({:<6}): {:>8.3f}s, "
+                      "peak RSS {:>9,} KiB".format(count, label, elapsed, rss))
+        count *= 10
+
+
+def _memory(count: int, results):
+    """ Bytes per User for the MODEL_LAYOUT of this process
+    """
+    tracemalloc.start()
+    users = [User(email="user{}@hbtn.io".format(i), first_name=str(i),
+                  last_name="Doe", _password="0" * 64)
+             for i in range(count)]
+    results.put(tracemalloc.get_traced_memory()[0] / len(users))
+
+
+def bench_memory(max_users: int):
+    """ Memory per User object for each MODEL_LAYOUT
+    """
+    context = multiprocessing.get_context("spawn")
+    layout = os.environ.get("MODEL_LAYOUT")
+    for name in ("dict", "slots", "packed"):
+        os.environ["MODEL_LAYOUT"] = name
+        results = context.Queue()
+        worker = context.Process(target=_memory, args=(max_users, results))
+        worker.start()
+        print("memory {:<6}: {:>6.0f} bytes/user".format(name, results.get()))
+        worker.join()
+    if layout is None:
+        del os.environ["MODEL_LAYOUT"]
+    else:
+        os.environ["MODEL_LAYOUT"] = layout
+
+
+def timed(func) -> float:
+    """ Duration of one func() call in milliseconds
+    """
+    start = time.perf_counter()
+    func()
+    return (time.perf_counter() - start) * 1e3
+
+
+def bench_json(max_users: int):
+    """ GET /api/v1/users payload and save_to_file, cold vs cached to_json
+    """
+    def invalidate():
+        """ Drop the cached to_json of every user
+        """
+        for user in users:
+            user.first_name = user.first_name
+
+    def get_users():
+        """ Body of GET /api/v1/users without Flask
+        """
+        json.dumps([user.to_json() for user in User.all()])
+
+    count = 1000
+    while count <= max_users:
+        users = populate(count)
+        with tempfile.TemporaryDirectory() as directory:
+            cwd = os.getcwd()
+            os.chdir(directory)
+            results = []
+            for func in (get_users, User.save_to_file):
+                invalidate()
+                results.append(timed(func))
+                results.append(timed(func))
+            os.chdir(cwd)
+        print("json {:>9,} users: GET /users {:>8.1f}ms cold, {:>8.1f}ms "
+              "cached; save_to_file {:>8.1f}ms cold, {:>8.1f}ms "
+              "cached".format(count, *results))
+        count *= 10
+
+
+if __name__ == "__main__":
+    mode = sys.argv[1] if len(sys.argv) > 1 else "search"
+    max_users = int(sys.argv[2]) if len(sys.argv) > 2 else 100000
+    {"search": bench_search, "load": bench_load,
+     "memory": bench_memory, "json": bench_json}[mode](max_users)
@@ -0,0 +1,30 @@
+#!/usr/bin/env python3
+"""
+Fixtures shared by the tests
+"""
+import pytest
+
+import models.base
+from models.engine import file_storage
+
+
+@pytest.fixture
+def use_storage(tmp_path, monkeypatch):
+    """
+    Run in tmp_path with the module state of the file engine emptied
+
+    Returns a function making a storage engine the one of the models
+    """
+    monkeypatch.chdir(tmp_path)
+    for name in ("DATA", "INDEXES", "ORDERS", "SIGNATURES",
+                 "JOURNAL_STATS"):
+        monkeypatch.setattr(file_storage, name, {})
+
+    def use(engine):
+        """
+        Make engine the storage of the models, for this test
+        """
+        monkeypatch.setattr(models.base, "storage", engine)
+        return engine
+
+    return use
@@ -3,29 +3,97 @@
 Base model
 """
 import os
-import json
 import uuid
-from datetime import datetime
+from datetime import datetime, timedelta
 from typing import TypeVar, List, Iterable
+from models.engine import storage
 
 
 TIMESTAMP_FORMAT = "%Y-%m-%dT%H:%M:%S"
-DATA = {}
+
+# "dict" keeps a per-instance __dict__, "slots" stores attributes in
+# __slots__, "packed" also keeps timestamps as epoch seconds (ints)
+MODEL_LAYOUT = os.getenv("MODEL_LAYOUT", "dict")
+EPOCH = datetime(1970, 1, 1)
+_SLOT_NAMES = {}
+
+
+def parse_timestamp(value: str) -> datetime:
+    """
+    Parse a TIMESTAMP_FORMAT string, much faster than strptime
+    """
+    if len(value) == 19 and value[10] == "T":
+        return datetime.fromisoformat(value)
+    return datetime.strptime(value, TIMESTAMP_FORMAT)
+
+
+def model_slots(*names: str) -> tuple:
+    """
+    Return the __slots__ of a model class for the current MODEL_LAYOUT
+    """
+    return names if MODEL_LAYOUT in ("slots", "packed") else ()
+
+
+def flush() -> None:
+    """
+    Write pending changes of the storage engine to disk
+    """
+    storage.flush()
 
 
 class Base():
     """
     Base class for all models
+
+    Objects are stored by the engine selected with STORAGE_TYPE (see
+    models.engine). Subclasses list the attributes the engine should
+    index in `indexed_attributes`, which search() uses when it can.
+
+    to_json() caches its result until the next attribute assignment;
+    in-place changes of mutable attribute values are not detected.
     """
 
+    indexed_attributes = ()
+
+    if MODEL_LAYOUT == "packed":
+        __slots__ = ("id", "_created_at", "_updated_at", "_serialized")
+
+        @property
+        def created_at(self) -> datetime:
+            """
+            Getter of the creation date
+            """
+            return EPOCH + timedelta(seconds=self._created_at)
+
+        @created_at.setter
+        def created_at(self, value: datetime):
+            """
+            Setter of the creation date, kept as epoch seconds
+            """
+            self._created_at = int((value - EPOCH).total_seconds())
+
+        @property
+        def updated_at(self) -> datetime:
+            """
+            Getter of the update date
+            """
+            return EPOCH + timedelta(seconds=self._updated_at)
+
+        @updated_at.setter
+        def updated_at(self, value: datetime):
+            """
+            Setter of the update date, kept as epoch seconds
+            """
+            self._updated_at = int((value - EPOCH).total_seconds())
+    elif MODEL_LAYOUT == "slots":
+        __slots__ = ("id", "created_at", "updated_at", "_serialized")
+    else:
+        __slots__ = ("__dict__", "__weakref__")
+
     def __init__(self, *args: list, **kwargs: dict):
         """
         Initialize a Base instance
         """
-        s_class = str(self.__class__.__name__)
-        if DATA.get(s_class) is None:
-            DATA[s_class] = {}
-
         self.id = str(uuid.uuid4())
         self.created_at = datetime.now()
         self.updated_at = self.created_at
@@ -34,9 +102,16 @@ class Base():
                 if key == "id":
                     self.id = value
                 elif key == "created_at":
-                    self.created_at = datetime.strptime(value, TIMESTAMP_FORMAT)
+                    self.created_at = parse_timestamp(value)
                 elif key == "updated_at":
-                    self.updated_at = datetime.strptime(value, TIMESTAMP_FORMAT)
+                    self.updated_at = parse_timestamp(value)
+
+    def __setattr__(self, name: str, value):
+        """
+        Set an attribute and drop the cached serialized form
+        """
+        object.__setattr__(self, name, value)
+        object.__setattr__(self, "_serialized", None)
 
     def __eq__(self, other: TypeVar('Base')) -> bool:
         """
@@ -48,75 +123,150 @@ class Base():
             return False
         return self.id == other.id
 
-    def to_json(self, for_serialization: bool = False) -> dict:
+    @classmethod
+    def _slot_names(cls) -> tuple:
         """
-        Convert the object a JSON dictionary
+        Public names of the attributes stored in slots, in MRO order
+        """
+        names = _SLOT_NAMES.get(cls)
+        if names is None:
+            names = []
+            for klass in reversed(cls.__mro__):
+                for name in klass.__dict__.get("__slots__", ()):
+                    if name in ("__dict__", "__weakref__", "_serialized"):
+                        continue
+                    if klass is Base and name[0] == '_':
+                        name = name[1:]
+                    names.append(name)
+            names = _SLOT_NAMES[cls] = tuple(names)
+        return names
+
+    def _attributes(self) -> dict:
         """
+        Instance attributes by name, whatever the MODEL_LAYOUT
+        """
+        names = self.__class__._slot_names()
+        if not names:
+            return self.__dict__
         result = {}
-        for key, value in self.__dict__.items():
-            if not for_serialization and key[0] == '_':
-                continue
-            if type(value) is datetime:
-                result[key] = value.strftime(TIMESTAMP_FORMAT)
-            else:
-                result[key] = value
+        for name in names:
+            try:
+                result[name] = getattr(self, name)
+            except AttributeError:
+                pass
+        result.update(getattr(self, "__dict__", {}))
         return result
 
+    def to_json(self, for_serialization: bool = False) -> dict:
+        """
+        Convert the object a JSON dictionary
+        """
+        serialized = getattr(self, "_serialized", None)
+        if serialized is None:
+            full = {}
+            for key, value in self._attributes().items():
+                if key == "_serialized":
+                    continue
+                if type(value) is datetime:
+                    full[key] = value.strftime(TIMESTAMP_FORMAT)
+                else:
+                    full[key] = value
+            public = {k: v for k, v in full.items() if k[0] != '_'}
+            serialized = (public, full)
+            object.__setattr__(self, "_serialized", serialized)
+        return dict(serialized[1] if for_serialization else serialized[0])
+
+    @classmethod
+    def _hydrator(cls):
+        """
+        Return a function building instances from their serialized form
+
+        Objects are created without running __init__, so no throwaway
+        UUID or timestamp is generated; attributes missing from the
+        serialized form get the defaults of a freshly built instance.
+        Slotted layouts ignore attributes the class has no slot for
+        """
+        defaults = dict(cls()._attributes())
+        defaults.pop("_serialized", None)
+        for key in ("id", "created_at", "updated_at"):
+            defaults[key] = None
+        new = cls.__new__
+        slotted = bool(cls._slot_names())
+
+        def hydrate(obj_json: dict) -> TypeVar('Base'):
+            """
+            Build one instance from its serialized form
+            """
+            obj = new(cls)
+            attrs = {} if slotted else obj.__dict__
+            attrs.update(defaults)
+            attrs.update(obj_json)
+            for key in ("created_at", "updated_at"):
+                if type(attrs[key]) is str:
+                    attrs[key] = parse_timestamp(attrs[key])
+            if slotted:
+                for key, value in attrs.items():
+                    try:
+                        setattr(obj, key, value)
+                    except AttributeError:
+                        pass
+            return obj
+
+        return hydrate
+
     @classmethod
     def load_from_file(cls):
         """
         Load all objects from file
         """
-        s_class = cls.__name__
-        file_path = ".db_{}.json".format(s_class)
-        DATA[s_class] = {}
-        if not os.path.exists(file_path):
-            return
-
-        with open(file_path, 'r') as f:
-            objs_json = json.load(f)
-            for obj_id, obj_json in objs_json.items():
-                DATA[s_class][obj_id] = cls(**obj_json)
+        storage.load(cls)
 
     @classmethod
     def save_to_file(cls):
         """
         Save all objects to file
         """
-        s_class = cls.__name__
-        file_path = ".db_{}.json".format(s_class)
-        objs_json = {}
-        for obj_id, obj in DATA[s_class].items():
-            objs_json[obj_id] = obj.to_json(True)
-
-        with open(file_path, 'w') as f:
-            json.dump(objs_json, f)
+        storage.dump(cls)
 
     def save(self):
         """
         Save current object
         """
-        s_class = self.__class__.__name__
         self.updated_at = datetime.now()
-        DATA[s_class][self.id] = self
-        self.__class__.save_to_file()
+        storage.save(self)
 
     def remove(self):
         """
         Remove object
         """
-        s_class = self.__class__.__name__
-        if DATA[s_class].get(self.id) is not None:
-            del DATA[s_class][self.id]
-            self.__class__.save_to_file()
+        storage.remove(self)
+
+    @classmethod
+    def save_many(cls, objs: Iterable[TypeVar('Base')]):
+        """
+        Save several objects, persisting them at once
+        """
+        objs = list(objs)
+        now = datetime.now()
+        for obj in objs:
+            obj.updated_at = now
+        storage.save_many(cls, objs)
+
+    @classmethod
+    def remove_many(cls, ids: Iterable[str]) -> List[str]:
+        """
+        Remove the objects with the given IDs, persisting at once
+
+        Return the IDs of the objects that existed
+        """
+        return storage.remove_many(cls, list(ids))
 
     @classmethod
     def count(cls) -> int:
         """
         Count all objects
         """
-        s_class = cls.__name__
-        return len(DATA[s_class].keys())
+        return storage.count(cls)
 
     @classmethod
     def all(cls) -> Iterable[TypeVar('Base')]:
@@ -125,26 +275,26 @@ class Base():
         """
         return cls.search()
 
+    @classmethod
+    def page(cls, limit: int, after: tuple = None) -> List[TypeVar('Base')]:
+        """
+        Return up to `limit` objects in (created_at, id) order
+
+        `after` is the (created_at, id) key of the last object of the
+        previous page
+        """
+        return storage.page(cls, limit, after)
+
     @classmethod
     def get(cls, id: str) -> TypeVar('Base'):
         """
         Return one object by ID
         """
-        s_class = cls.__name__
-        return DATA[s_class].get(id)
+        return storage.get(cls, id)
 
     @classmethod
     def search(cls, attributes: dict = {}) -> List[TypeVar('Base')]:
         """
         Search all objects with matching attributes
         """
-        s_class = cls.__name__
-        def _search(obj):
-            if len(attributes) == 0:
-                return True
-            for k, v in attributes.items():
-                if (getattr(obj, k) != v):
-                    return False
-            return True
-        
-        return list(filter(_search, DATA[s_class].values()))
+        return storage.search(cls, attributes)
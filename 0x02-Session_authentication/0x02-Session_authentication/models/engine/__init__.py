@@ -0,0 +1,16 @@
+#!/usr/bin/env python3
+"""
+Storage engines of the models, selected by STORAGE_TYPE
+"""
+from os import getenv
+
+
+storage = None
+storage_type = getenv('STORAGE_TYPE')
+
+if storage_type == 'sqlite':
+    from models.engine.sqlite_storage import SQLiteStorage
+    storage = SQLiteStorage()
+else:
+    from models.engine.file_storage import FileStorage
+    storage = FileStorage()
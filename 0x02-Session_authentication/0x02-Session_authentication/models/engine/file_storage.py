@@ -0,0 +1,769 @@
+#!/usr/bin/env python3
+"""
+File storage engine: objects in memory, persisted to .db_<Class> files
+"""
+import os
+import json
+import atexit
+import bisect
+import fcntl
+import itertools
+import threading
+from contextlib import contextmanager
+from datetime import datetime
+from typing import TypeVar, List
+
+
+DATA = {}
+INDEXES = {}
+ORDERS = {}
+
+# "snapshot" rewrites .db_<Class>.json on every change, "journal" appends
+# one line per change to .db_<Class>.journal and compacts it periodically,
+# "write_behind" rewrites .db_<Class>.json from a background thread
+PERSISTENCE_MODE = os.getenv("PERSISTENCE_MODE", "snapshot")
+try:
+    WRITE_BEHIND_INTERVAL = float(os.getenv("WRITE_BEHIND_INTERVAL", 1.0))
+except (ValueError, TypeError):
+    WRITE_BEHIND_INTERVAL = 1.0
+try:
+    WRITE_BEHIND_MAX_DIRTY = int(os.getenv("WRITE_BEHIND_MAX_DIRTY", 1000))
+except (ValueError, TypeError):
+    WRITE_BEHIND_MAX_DIRTY = 1000
+try:
+    JOURNAL_MAX_BYTES = int(os.getenv("JOURNAL_MAX_BYTES", 16 * 1024 * 1024))
+except (ValueError, TypeError):
+    JOURNAL_MAX_BYTES = 16 * 1024 * 1024
+try:
+    JOURNAL_MAX_RATIO = float(os.getenv("JOURNAL_MAX_RATIO", 2.0))
+except (ValueError, TypeError):
+    JOURNAL_MAX_RATIO = 2.0
+try:
+    JOURNAL_MIN_ENTRIES = int(os.getenv("JOURNAL_MIN_ENTRIES", 1000))
+except (ValueError, TypeError):
+    JOURNAL_MIN_ENTRIES = 1000
+JOURNAL_STATS = {}
+
+# "1" when several processes share the .db_* files: writes take an
+# fcntl lock and every access first reloads what other processes changed
+STORE_SHARED = os.getenv("STORE_SHARED", "0") == "1"
+SIGNATURES = {}
+_FILE_LOCKS = {}
+_SEQUENCE = itertools.count()
+
+
+class Index():
+    """
+    Secondary hash index mapping an attribute value to objects
+
+    Every entry gets a sequence number when first indexed, and buckets
+    are kept in that order, which is the order of the objects in DATA
+    """
+
+    def __init__(self):
+        """
+        Initialize an empty index
+        """
+        self.buckets = {}
+        self.values = {}
+        self.order = {}
+
+    def add(self, obj: TypeVar('Base'), value) -> None:
+        """
+        Index obj under value, replacing its previous entry
+        """
+        if obj.id in self.values:
+            if self.values[obj.id] == value:
+                self.buckets[value][obj.id] = obj
+                return
+            self._remove(obj.id)
+        seq = self.order.get(obj.id)
+        if seq is None:
+            seq = self.order[obj.id] = next(_SEQUENCE)
+        bucket = self.buckets.setdefault(value, {})
+        last = next(reversed(bucket), None)
+        bucket[obj.id] = obj
+        self.values[obj.id] = value
+        if last is not None and self.order[last] > seq:
+            # An older object moved to this value: restore the order
+            self.buckets[value] = dict(
+                sorted(bucket.items(), key=lambda item: self.order[item[0]]))
+
+    def _remove(self, obj_id: str) -> None:
+        """
+        Remove an object from its bucket, keeping its sequence number
+        """
+        value = self.values.pop(obj_id)
+        bucket = self.buckets[value]
+        del bucket[obj_id]
+        if not bucket:
+            del self.buckets[value]
+
+    def discard(self, obj_id: str) -> None:
+        """
+        Remove the entry of an object if any
+        """
+        self.order.pop(obj_id, None)
+        if obj_id in self.values:
+            self._remove(obj_id)
+
+    def get(self, value) -> dict:
+        """
+        Return the objects indexed under value, by ID
+        """
+        return self.buckets.get(value, {})
+
+
+class KeyOrder():
+    """
+    (created_at, id) keys of the objects of a class, kept sorted so a
+    page of objects is a slice
+    """
+
+    def __init__(self, objs):
+        """
+        Initialize with the keys of objs, sorted once
+        """
+        self.ids = {obj.id: (obj.created_at, obj.id) for obj in objs}
+        self.keys = sorted(self.ids.values())
+
+    def add(self, obj: TypeVar('Base')) -> None:
+        """
+        Insert or move the key of obj
+        """
+        key = (obj.created_at, obj.id)
+        old = self.ids.get(obj.id)
+        if old == key:
+            return
+        if old is not None:
+            del self.keys[bisect.bisect_left(self.keys, old)]
+        bisect.insort(self.keys, key)
+        self.ids[obj.id] = key
+
+    def discard(self, obj_id: str) -> None:
+        """
+        Remove the key of an object if any
+        """
+        key = self.ids.pop(obj_id, None)
+        if key is not None:
+            del self.keys[bisect.bisect_left(self.keys, key)]
+
+    def page(self, limit: int, after: tuple = None) -> List[str]:
+        """
+        IDs of up to `limit` objects whose key follows `after`
+        """
+        start = 0 if after is None else \
+            bisect.bisect_right(self.keys, after)
+        return [key[1] for key in self.keys[start:start + limit]]
+
+
+class RWLock():
+    """
+    Readers-writer lock: many readers or one writer, writers first
+
+    `with lock.read():` and `with lock.write():` hold it shared or
+    exclusively. The writer may re-enter write() and read(); readers
+    must not nest
+    """
+
+    def __init__(self):
+        """
+        Initialize an unlocked lock
+        """
+        self.mutex = threading.Lock()
+        self.cond = threading.Condition(self.mutex)
+        self.readers = 0
+        self.writer = None
+        self.depth = 0
+        self.writer_reads = 0
+        self.waiting_writers = 0
+        self._shared = _SharedHold(self)
+        self._exclusive = _ExclusiveHold(self)
+
+    def read(self) -> '_SharedHold':
+        """
+        Context manager holding the lock shared
+        """
+        return self._shared
+
+    def write(self) -> '_ExclusiveHold':
+        """
+        Context manager holding the lock exclusively
+        """
+        return self._exclusive
+
+
+class _SharedHold():
+    """
+    Shared side of an RWLock
+    """
+
+    def __init__(self, lock: RWLock):
+        """
+        Initialize for lock
+        """
+        self.lock = lock
+
+    def __enter__(self):
+        """
+        Wait for the writers, unless the writer itself reads
+        """
+        lock = self.lock
+        if lock.writer == threading.get_ident():
+            lock.writer_reads += 1
+            return
+        with lock.mutex:
+            while lock.writer is not None or lock.waiting_writers:
+                lock.cond.wait()
+            lock.readers += 1
+
+    def __exit__(self, *exc_info):
+        """
+        Release a shared hold
+        """
+        lock = self.lock
+        if lock.writer_reads and lock.writer == threading.get_ident():
+            lock.writer_reads -= 1
+            return
+        with lock.mutex:
+            lock.readers -= 1
+            if not lock.readers and lock.waiting_writers:
+                lock.cond.notify_all()
+
+
+class _ExclusiveHold():
+    """
+    Exclusive side of an RWLock
+    """
+
+    def __init__(self, lock: RWLock):
+        """
+        Initialize for lock
+        """
+        self.lock = lock
+
+    def __enter__(self):
+        """
+        Wait for the readers and the other writer
+        """
+        lock = self.lock
+        me = threading.get_ident()
+        with lock.mutex:
+            if lock.writer != me:
+                lock.waiting_writers += 1
+                while lock.writer is not None or lock.readers:
+                    lock.cond.wait()
+                lock.waiting_writers -= 1
+                lock.writer = me
+            lock.depth += 1
+
+    def __exit__(self, *exc_info):
+        """
+        Release an exclusive hold
+        """
+        lock = self.lock
+        with lock.mutex:
+            lock.depth -= 1
+            if not lock.depth:
+                lock.writer = None
+                lock.cond.notify_all()
+
+
+STORE_LOCK = RWLock()
+
+
+class WriteBehindFlusher():
+    """
+    Coalesces snapshot rewrites of dirty classes on a background thread
+
+    Classes are flushed every `interval` seconds, or as soon as
+    `max_dirty` changes are pending, so a burst of saves costs one rewrite
+    """
+
+    def __init__(self, write, interval: float, max_dirty: int):
+        """
+        Initialize an idle flusher calling write(cls) for each dirty class
+        """
+        self.write = write
+        self.interval = interval
+        self.max_dirty = max_dirty
+        self.dirty = {}
+        self.last_error = None
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._thread = None
+
+    def mark(self, cls) -> None:
+        """
+        Record a pending change of a class
+        """
+        with self._lock:
+            self.dirty[cls] = self.dirty.get(cls, 0) + 1
+            pending = sum(self.dirty.values())
+            if self._thread is None:
+                self._thread = threading.Thread(
+                    target=self._run, name="write-behind", daemon=True)
+                self._thread.start()
+        if pending >= self.max_dirty:
+            self._wakeup.set()
+
+    def flush(self) -> None:
+        """
+        Rewrite the snapshot of every dirty class now
+
+        A class whose write fails stays dirty, to be written again by the
+        next flush; the first error is raised once every class was tried
+        """
+        with self._flush_lock:
+            with self._lock:
+                pending = list(self.dirty.items())
+                self.dirty.clear()
+            error = None
+            for cls, changes in pending:
+                try:
+                    self.write(cls)
+                except Exception as e:
+                    with self._lock:
+                        self.dirty[cls] = self.dirty.get(cls, 0) + changes
+                    error = error or e
+            if error is not None:
+                self.last_error = error
+                raise error
+
+    def _run(self) -> None:
+        """
+        Flush periodically or when woken up by mark()
+
+        Failed writes are retried at the next interval; the last error is
+        kept in last_error
+        """
+        while True:
+            self._wakeup.wait(self.interval)
+            self._wakeup.clear()
+            try:
+                self.flush()
+            except Exception:
+                pass
+
+
+class FileStorage():
+    """
+    Keeps every object in DATA and persists changes to .db_<Class> files
+
+    search() uses the indexes of the `indexed_attributes` of the class
+    and falls back to a scan otherwise. Indexes reflect the state of
+    objects as of their last save().
+
+    Reads hold STORE_LOCK shared and mutations hold it exclusively.
+    With STORE_SHARED, mutations also hold an fcntl lock on
+    .db_<Class>.lock, and every access first catches up with the files.
+    write_behind keeps unflushed changes private to its process, so
+    it is not meant to be combined with STORE_SHARED
+    """
+
+    def __init__(self):
+        """
+        Initialize the storage and its write-behind flusher
+        """
+        self.flusher = WriteBehindFlusher(self._flush_snapshot,
+                                          WRITE_BEHIND_INTERVAL,
+                                          WRITE_BEHIND_MAX_DIRTY)
+        atexit.register(self.flusher.flush)
+
+    def _objects(self, cls) -> dict:
+        """
+        Objects of the class by ID, creating its empty store if needed
+        """
+        objs = DATA.get(cls.__name__)
+        if objs is None:
+            INDEXES.setdefault(cls.__name__, self._new_indexes(cls))
+            objs = DATA.setdefault(cls.__name__, {})
+        return objs
+
+    def _new_indexes(self, cls) -> dict:
+        """
+        Empty indexes for the class, by attribute
+        """
+        return {attr: Index() for attr in cls.indexed_attributes}
+
+    def _reset(self, cls):
+        """
+        Empty the objects and indexes of the class
+        """
+        INDEXES[cls.__name__] = self._new_indexes(cls)
+        ORDERS.pop(cls.__name__, None)
+        DATA[cls.__name__] = {}
+
+    def _index(self, obj: TypeVar('Base')):
+        """
+        Add or refresh the index entries of the object
+        """
+        s_class = obj.__class__.__name__
+        for attr, index in INDEXES[s_class].items():
+            try:
+                index.add(obj, getattr(obj, attr, None))
+            except TypeError:
+                index.discard(obj.id)
+        order = ORDERS.get(s_class)
+        if order is not None:
+            order.add(obj)
+
+    def _unindex(self, obj: TypeVar('Base')):
+        """
+        Remove the index entries of the object
+        """
+        s_class = obj.__class__.__name__
+        for index in INDEXES[s_class].values():
+            index.discard(obj.id)
+        order = ORDERS.get(s_class)
+        if order is not None:
+            order.discard(obj.id)
+
+    @contextmanager
+    def _file_lock(self, cls):
+        """
+        Hold the cross-process lock of the class files when STORE_SHARED
+
+        Re-entrant: STORE_LOCK already keeps other threads out
+        """
+        s_class = cls.__name__
+        if not STORE_SHARED or s_class in _FILE_LOCKS:
+            yield
+            return
+        with open(".db_{}.lock".format(s_class), 'a') as f:
+            fcntl.flock(f, fcntl.LOCK_EX)
+            _FILE_LOCKS[s_class] = f
+            try:
+                yield
+            finally:
+                del _FILE_LOCKS[s_class]
+                fcntl.flock(f, fcntl.LOCK_UN)
+
+    def _signature(self, cls) -> tuple:
+        """
+        (inode, mtime, size) of the snapshot and of the journal
+        """
+        signature = []
+        for ext in ("json", "journal"):
+            try:
+                st = os.stat(".db_{}.{}".format(cls.__name__, ext))
+                signature.append((st.st_ino, st.st_mtime_ns, st.st_size))
+            except FileNotFoundError:
+                signature.append(None)
+        return tuple(signature)
+
+    def _record_signature(self, cls):
+        """
+        Remember the files state the in-memory objects match
+        """
+        if STORE_SHARED:
+            SIGNATURES[cls.__name__] = self._signature(cls)
+
+    def _refresh_locked(self, cls):
+        """
+        Catch up with changes made by other processes
+
+        Only the new journal entries are replayed when the snapshot is
+        unchanged and the journal only grew; otherwise reload everything.
+        Both locks must be held
+        """
+        if not STORE_SHARED:
+            return
+        old = SIGNATURES.get(cls.__name__)
+        new = self._signature(cls)
+        if old == new:
+            return
+        if old is not None and old[0] == new[0] and old[1] and new[1] \
+                and old[1][0] == new[1][0] and new[1][2] > old[1][2]:
+            self._replay_journal(cls, old[1][2])
+        else:
+            self._load(cls)
+        self._record_signature(cls)
+
+    def _refresh(self, cls):
+        """
+        Reload what other processes changed before reading
+        """
+        if not STORE_SHARED or \
+                SIGNATURES.get(cls.__name__) == self._signature(cls):
+            return
+        with STORE_LOCK.write(), self._file_lock(cls):
+            self._refresh_locked(cls)
+
+    def load(self, cls):
+        """
+        Load all objects of the class from file
+
+        Reads the JSON snapshot, then replays the journal on top of it.
+        Objects are hydrated in bulk and indexed in the same pass
+        """
+        with STORE_LOCK.write(), self._file_lock(cls):
+            self._load(cls)
+            self._record_signature(cls)
+
+    def _load(self, cls):
+        """
+        Load all objects from file, with both locks held
+        """
+        s_class = cls.__name__
+        file_path = ".db_{}.json".format(s_class)
+        self._reset(cls)
+        if os.path.exists(file_path):
+            with open(file_path, 'r') as f:
+                objs_json = json.load(f)
+            hydrate = cls._hydrator()
+            objs = DATA[s_class]
+            indexes = INDEXES[s_class].items()
+            for obj_id, obj_json in objs_json.items():
+                obj = hydrate(obj_json)
+                objs[obj_id] = obj
+                for attr, index in indexes:
+                    try:
+                        index.add(obj, getattr(obj, attr, None))
+                    except TypeError:
+                        pass
+            del objs_json
+        self._replay_journal(cls)
+
+    def _replay_journal(self, cls, offset: int = 0):
+        """
+        Apply the journal entries written since the last snapshot
+
+        `offset` is the number of bytes of the journal already applied
+        """
+        s_class = cls.__name__
+        journal_path = ".db_{}.journal".format(s_class)
+        if not offset:
+            JOURNAL_STATS[s_class] = {"entries": 0, "bytes": 0}
+        stats = JOURNAL_STATS.setdefault(s_class, {"entries": 0, "bytes": 0})
+        if not os.path.exists(journal_path):
+            return
+
+        with open(journal_path, 'rb') as f:
+            f.seek(offset)
+            content = f.read()
+        complete, _, torn = content.rpartition(b"\n")
+        if torn:
+            # Drop a torn last line left by an interrupted write
+            os.truncate(journal_path, offset + len(content) - len(torn))
+        complete = complete.decode()
+
+        hydrate = cls._hydrator()
+        objs = self._objects(cls)
+        for line in complete.splitlines():
+            entry = json.loads(line)
+            stats["entries"] += 1
+            stats["bytes"] += len(line) + 1
+            old = objs.pop(entry["id"], None)
+            if old is not None:
+                self._unindex(old)
+            if entry["op"] == "put":
+                obj = hydrate(entry["obj"])
+                objs[obj.id] = obj
+                self._index(obj)
+
+    def _append_journal(self, cls, changes: list):
+        """
+        Append (op, obj) put or delete entries in one write, compacting
+        when the journal grows too big
+        """
+        s_class = cls.__name__
+        lines = []
+        for op, obj in changes:
+            entry = {"op": op, "id": obj.id}
+            if op == "put":
+                entry["obj"] = obj.to_json(True)
+            lines.append(json.dumps(entry) + "\n")
+        with open(".db_{}.journal".format(s_class), 'a') as f:
+            f.write("".join(lines))
+        # These entries are already in memory: compact() must not replay them
+        self._record_signature(cls)
+
+        stats = JOURNAL_STATS.setdefault(s_class, {"entries": 0, "bytes": 0})
+        stats["entries"] += len(lines)
+        stats["bytes"] += sum(len(line) for line in lines)
+        if stats["bytes"] >= JOURNAL_MAX_BYTES or \
+                (stats["entries"] >= JOURNAL_MIN_ENTRIES and
+                 stats["entries"] > JOURNAL_MAX_RATIO * len(DATA[s_class])):
+            self.compact(cls)
+
+    def compact(self, cls):
+        """
+        Fold the journal into a fresh snapshot and truncate it
+
+        The snapshot is written first, so replaying a journal left behind
+        by a crash in between gives the same state
+        """
+        s_class = cls.__name__
+        with STORE_LOCK.write(), self._file_lock(cls):
+            self._refresh_locked(cls)
+            self.dump(cls)
+            with open(".db_{}.journal".format(s_class), 'w'):
+                pass
+            JOURNAL_STATS[s_class] = {"entries": 0, "bytes": 0}
+            self._record_signature(cls)
+
+    def _flush_snapshot(self, cls):
+        """
+        Rewrite the snapshot holding the locks, for write-behind flushes
+        """
+        with STORE_LOCK.read(), self._file_lock(cls):
+            self.dump(cls)
+            self._record_signature(cls)
+
+    def dump(self, cls):
+        """
+        Save all objects of the class to file
+
+        Written to a temporary file then renamed, so readers never see a
+        partial snapshot. Callers hold the locks
+        """
+        file_path = ".db_{}.json".format(cls.__name__)
+        objs_json = {}
+        for obj_id, obj in list(self._objects(cls).items()):
+            objs_json[obj_id] = obj.to_json(True)
+
+        tmp_path = "{}.tmp".format(file_path)
+        with open(tmp_path, 'w') as f:
+            json.dump(objs_json, f)
+        os.replace(tmp_path, file_path)
+
+    def flush(self):
+        """
+        Write pending write-behind changes to disk
+        """
+        self.flusher.flush()
+
+    def _persist(self, cls, changes: list):
+        """
+        Persist (op, obj) puts and deletes according to PERSISTENCE_MODE
+        """
+        if not changes:
+            return
+        if PERSISTENCE_MODE == "journal":
+            self._append_journal(cls, changes)
+        elif PERSISTENCE_MODE == "write_behind":
+            self.flusher.mark(cls)
+        else:
+            self.dump(cls)
+
+    def save(self, obj: TypeVar('Base')):
+        """
+        Store the object and persist it
+        """
+        cls = obj.__class__
+        with STORE_LOCK.write(), self._file_lock(cls):
+            self._refresh_locked(cls)
+            self._objects(cls)[obj.id] = obj
+            self._index(obj)
+            self._persist(cls, [("put", obj)])
+            self._record_signature(cls)
+
+    def remove(self, obj: TypeVar('Base')):
+        """
+        Delete the object if it is stored
+        """
+        cls = obj.__class__
+        with STORE_LOCK.write(), self._file_lock(cls):
+            self._refresh_locked(cls)
+            objs = self._objects(cls)
+            if objs.get(obj.id) is not None:
+                del objs[obj.id]
+                self._unindex(obj)
+                self._persist(cls, [("delete", obj)])
+                self._record_signature(cls)
+
+    def save_many(self, cls, objs: List[TypeVar('Base')]):
+        """
+        Store the objects of the class and persist them at once
+        """
+        with STORE_LOCK.write(), self._file_lock(cls):
+            self._refresh_locked(cls)
+            stored = self._objects(cls)
+            for obj in objs:
+                stored[obj.id] = obj
+                self._index(obj)
+            self._persist(cls, [("put", obj) for obj in objs])
+            self._record_signature(cls)
+
+    def remove_many(self, cls, ids: List[str]) -> List[str]:
+        """
+        Delete the stored objects of the class with the given IDs, persist
+        at once and return the IDs actually removed
+        """
+        with STORE_LOCK.write(), self._file_lock(cls):
+            self._refresh_locked(cls)
+            stored = self._objects(cls)
+            removed = []
+            for id in ids:
+                obj = stored.pop(id, None)
+                if obj is not None:
+                    self._unindex(obj)
+                    removed.append(obj)
+            self._persist(cls, [("delete", obj) for obj in removed])
+            self._record_signature(cls)
+        return [obj.id for obj in removed]
+
+    def count(self, cls) -> int:
+        """
+        Count all objects of the class
+        """
+        self._refresh(cls)
+        with STORE_LOCK.read():
+            return len(self._objects(cls))
+
+    def page(self, cls, limit: int,
+             after: tuple = None) -> List[TypeVar('Base')]:
+        """
+        Up to `limit` objects in (created_at, id) order, after `after`
+
+        The sorted keys are built on the first call after a load, then
+        kept up to date by every change
+        """
+        self._refresh(cls)
+        with STORE_LOCK.read():
+            objs = self._objects(cls)
+            order = ORDERS.get(cls.__name__)
+            if order is None:
+                order = ORDERS[cls.__name__] = KeyOrder(objs.values())
+            return [objs[obj_id] for obj_id in order.page(limit, after)]
+
+    def get(self, cls, id: str) -> TypeVar('Base'):
+        """
+        One object of the class by ID
+        """
+        self._refresh(cls)
+        with STORE_LOCK.read():
+            return self._objects(cls).get(id)
+
+    def search(self, cls, attributes: dict) -> List[TypeVar('Base')]:
+        """
+        Objects of the class with matching attributes
+
+        Uses the index of the first indexed attribute searched for, and
+        scans all objects otherwise.
+        """
+        def _search(obj):
+            if len(attributes) == 0:
+                return True
+            for k, v in attributes.items():
+                if (getattr(obj, k) != v):
+                    return False
+            return True
+
+        self._refresh(cls)
+        with STORE_LOCK.read():
+            candidates = self._objects(cls).values()
+            indexes = INDEXES[cls.__name__]
+            for k, v in attributes.items():
+                if k not in indexes:
+                    continue
+                try:
+                    bucket = indexes[k].get(v)
+                except TypeError:
+                    continue
+                candidates = bucket.values()
+                break
+
+            return list(filter(_search, candidates))
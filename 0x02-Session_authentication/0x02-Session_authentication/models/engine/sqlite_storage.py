@@ -0,0 +1,230 @@
+#!/usr/bin/env python3
+"""
+SQLite storage engine: one table per class, in WAL mode
+"""
+import os
+import json
+import sqlite3
+import threading
+from typing import TypeVar, List
+
+
+SQLITE_PATH = os.getenv("SQLITE_PATH", ".db.sqlite3")
+try:
+    SQLITE_TIMEOUT = float(os.getenv("SQLITE_TIMEOUT", 30.0))
+except (ValueError, TypeError):
+    SQLITE_TIMEOUT = 30.0
+COLUMN_TYPES = (str, int, float)
+
+
+def _matches(obj: TypeVar('Base'), attributes: dict) -> bool:
+    """
+    True if every attribute of the object equals the searched value
+    """
+    for k, v in attributes.items():
+        if (getattr(obj, k) != v):
+            return False
+    return True
+
+
+class SQLiteStorage():
+    """
+    Persists every object as one row, committed on each save()/remove()
+
+    A table holds the serialized objects of one class, in a `data`
+    JSON column, next to one indexed column per `indexed_attributes`
+    entry. search() on such an attribute is an indexed query; other
+    attributes are matched on the loaded objects. Each thread has its
+    own connection, and WAL lets readers run alongside a writer,
+    including from other processes.
+    """
+
+    def __init__(self, path: str = SQLITE_PATH):
+        """
+        Initialize the storage on the database file at path
+        """
+        self.path = path
+        self._local = threading.local()
+        self._tables = set()
+        self._hydrators = {}
+
+    def _connection(self) -> sqlite3.Connection:
+        """
+        Connection of the current thread, in autocommit mode
+        """
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=SQLITE_TIMEOUT,
+                                   isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def _table(self, cls) -> str:
+        """
+        Name of the table of the class, created on first use
+        """
+        name = cls.__name__
+        if name not in self._tables:
+            conn = self._connection()
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS {} (id TEXT PRIMARY KEY, "
+                "created_at TEXT, data TEXT{})".format(
+                    name, "".join(", " + attr
+                                  for attr in cls.indexed_attributes)))
+            conn.execute("CREATE INDEX IF NOT EXISTS {0}_created_at "
+                         "ON {0} (created_at, id)".format(name))
+            for attr in cls.indexed_attributes:
+                conn.execute("CREATE INDEX IF NOT EXISTS {0}_{1} "
+                             "ON {0} ({1})".format(name, attr))
+            self._tables.add(name)
+        return name
+
+    def _hydrate(self, cls, rows) -> List[TypeVar('Base')]:
+        """
+        Objects built from rows whose first column is `data`
+        """
+        hydrate = self._hydrators.get(cls)
+        if hydrate is None:
+            hydrate = self._hydrators[cls] = cls._hydrator()
+        return [hydrate(json.loads(row[0])) for row in rows]
+
+    def load(self, cls):
+        """
+        Create the table of the class; rows are read on demand
+        """
+        self._table(cls)
+
+    def dump(self, cls):
+        """
+        Nothing to write: every change is committed when it is made
+        """
+        self._table(cls)
+
+    def flush(self):
+        """
+        Nothing pending: every change is committed when it is made
+        """
+
+    def _row(self, obj: TypeVar('Base')) -> list:
+        """
+        Column values of the row of the object, in _upsert() order
+        """
+        obj_json = obj.to_json(True)
+        values = [obj.id, obj_json.get("created_at"), json.dumps(obj_json)]
+        for attr in obj.__class__.indexed_attributes:
+            value = getattr(obj, attr, None)
+            values.append(value if type(value) in COLUMN_TYPES else None)
+        return values
+
+    def _upsert(self, cls) -> str:
+        """
+        Statement inserting or updating one row of the class
+        """
+        columns = ["id", "created_at", "data"] + \
+            list(cls.indexed_attributes)
+        return "INSERT INTO {} ({}) VALUES ({}) ON CONFLICT(id) DO UPDATE " \
+            "SET {}".format(
+                self._table(cls), ", ".join(columns),
+                ", ".join("?" * len(columns)),
+                ", ".join("{0} = excluded.{0}".format(column)
+                          for column in columns[1:]))
+
+    def save(self, obj: TypeVar('Base')):
+        """
+        Insert or update the row of the object
+        """
+        self._connection().execute(self._upsert(obj.__class__),
+                                   self._row(obj))
+
+    def remove(self, obj: TypeVar('Base')):
+        """
+        Delete the row of the object if any
+        """
+        self._connection().execute(
+            "DELETE FROM {} WHERE id = ?".format(self._table(obj.__class__)),
+            (obj.id,))
+
+    def save_many(self, cls, objs: List[TypeVar('Base')]):
+        """
+        Insert or update the rows of the objects in one transaction
+        """
+        sql = self._upsert(cls)
+        conn = self._connection()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            conn.executemany(sql, [self._row(obj) for obj in objs])
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        conn.execute("COMMIT")
+
+    def remove_many(self, cls, ids: List[str]) -> List[str]:
+        """
+        Delete the rows with the given IDs in one transaction and return
+        the IDs actually removed
+        """
+        table = self._table(cls)
+        conn = self._connection()
+        removed = []
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            for id in ids:
+                if conn.execute("DELETE FROM {} WHERE id = ?".format(table),
+                                (id,)).rowcount:
+                    removed.append(id)
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        conn.execute("COMMIT")
+        return removed
+
+    def count(self, cls) -> int:
+        """
+        Count all objects of the class
+        """
+        return self._connection().execute(
+            "SELECT COUNT(*) FROM {}".format(self._table(cls))).fetchone()[0]
+
+    def page(self, cls, limit: int,
+             after: tuple = None) -> List[TypeVar('Base')]:
+        """
+        Up to `limit` objects in (created_at, id) order, after `after`
+        """
+        sql = "SELECT data FROM {}".format(self._table(cls))
+        params = []
+        if after is not None:
+            sql += " WHERE (created_at, id) > (?, ?)"
+            params = [after[0].isoformat(timespec="seconds"), after[1]]
+        sql += " ORDER BY created_at, id LIMIT ?"
+        rows = self._connection().execute(sql, params + [limit])
+        return self._hydrate(cls, rows)
+
+    def get(self, cls, id: str) -> TypeVar('Base'):
+        """
+        One object of the class by ID
+        """
+        rows = self._connection().execute(
+            "SELECT data FROM {} WHERE id = ?".format(self._table(cls)),
+            (id,)).fetchall()
+        return self._hydrate(cls, rows)[0] if rows else None
+
+    def search(self, cls, attributes: dict) -> List[TypeVar('Base')]:
+        """
+        Objects of the class with matching attributes
+
+        Queries the index of the first indexed attribute searched for,
+        and reads all rows otherwise.
+        """
+        sql = "SELECT data FROM {}".format(self._table(cls))
+        params = ()
+        for k, v in attributes.items():
+            if k in cls.indexed_attributes and \
+                    (v is None or type(v) in COLUMN_TYPES):
+                sql += " WHERE {} IS ?".format(k)
+                params = (v,)
+                break
+        rows = self._connection().execute(sql + " ORDER BY rowid", params)
+        return [obj for obj in self._hydrate(cls, rows)
+                if _matches(obj, attributes)]
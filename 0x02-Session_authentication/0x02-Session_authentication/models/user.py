@@ -3,7 +3,7 @@
 User model
 """
 import hashlib
-from models.base import Base
+from models.base import Base, model_slots
 
 
 class User(Base):
@@ -11,6 +11,9 @@ class User(Base):
     User class
     """
 
+    indexed_attributes = ("email",)
+    __slots__ = model_slots("email", "first_name", "last_name", "_password")
+
     def __init__(self, *args: list, **kwargs: dict):
         """
         Initialize a User instance
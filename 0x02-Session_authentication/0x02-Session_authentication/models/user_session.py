@@ -2,14 +2,17 @@
 """
 UserSession model
 """
-from models.base import Base
+from models.base import Base, model_slots
 
 
 class UserSession(Base):
     """
     UserSession class for storing sessions in database
     """
-    
+
+    indexed_attributes = ("session_id",)
+    __slots__ = model_slots("user_id", "session_id")
+
     def __init__(self, *args: list, **kwargs: dict):
         """
         Initialize a UserSession instance
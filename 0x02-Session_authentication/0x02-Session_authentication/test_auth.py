@@ -0,0 +1,169 @@
+#!/usr/bin/env python3
+"""
+Tests of the authentication of the API
+"""
+import base64
+
+import pytest
+
+import api.v1.app
+from api.v1.app import app
+from api.v1.auth.basic_auth import BasicAuth
+from api.v1.auth.session_auth import SessionAuth
+from api.v1.auth.session_exp_auth import SessionExpAuth
+from api.v1.auth.session_token_auth import SessionTokenAuth
+from models.engine.file_storage import FileStorage
+from models.user import User
+
+SESSION_NAME = "_my_session_id"
+
+
+@pytest.fixture
+def lookups(use_storage, monkeypatch):
+    """
+    Empty file storage in tmp_path, and the list of the User.search and
+    User.get calls made since
+    """
+    monkeypatch.setenv("SESSION_NAME", SESSION_NAME)
+    use_storage(FileStorage())
+
+    calls = []
+    search, get = User.search.__func__, User.get.__func__
+
+    def counted_search(cls, attributes: dict = {}):
+        calls.append("search")
+        return search(cls, attributes)
+
+    def counted_get(cls, id: str):
+        calls.append("get")
+        return get(cls, id)
+
+    monkeypatch.setattr(User, "search", classmethod(counted_search))
+    monkeypatch.setattr(User, "get", classmethod(counted_get))
+    return calls
+
+
+def use_auth(monkeypatch, auth):
+    """
+    Make the app authenticate requests with auth
+    """
+    monkeypatch.setattr(api.v1.app, "auth", auth)
+    monkeypatch.setitem(app.config, "AUTH", auth)
+
+
+def create_user(email: str, password: str) -> User:
+    """
+    Save a new user
+    """
+    user = User(email=email)
+    user.password = password
+    user.save()
+    return user
+
+
+def basic(email: str, password: str) -> dict:
+    """
+    Authorization header of Basic credentials
+    """
+    credentials = "{}:{}".format(email, password).encode()
+    return {"Authorization":
+            "Basic " + base64.b64encode(credentials).decode()}
+
+
+def test_basic_auth_one_lookup_per_request(lookups, monkeypatch):
+    """
+    BasicAuth resolves the user once per request
+    """
+    use_auth(monkeypatch, BasicAuth())
+    user = create_user("bob@hbtn.io", "pwd")
+    client = app.test_client()
+    for _ in range(3):
+        del lookups[:]
+        response = client.get("/api/v1/users/me",
+                              headers=basic("bob@hbtn.io", "pwd"))
+        assert response.status_code == 200
+        assert response.get_json()["id"] == user.id
+        assert len(lookups) == 1
+
+
+def test_session_auth_one_lookup_per_request(lookups, monkeypatch):
+    """
+    SessionAuth resolves the user once per request
+    """
+    use_auth(monkeypatch, SessionAuth())
+    user = create_user("bob@hbtn.io", "pwd")
+    client = app.test_client()
+    response = client.post("/api/v1/auth_session/login",
+                           data={"email": "bob@hbtn.io", "password": "pwd"})
+    assert response.status_code == 200
+    for _ in range(3):
+        del lookups[:]
+        response = client.get("/api/v1/users/me")
+        assert response.status_code == 200
+        assert response.get_json()["id"] == user.id
+        assert lookups == ["get"]
+
+
+def test_no_leak_across_requests_of_an_app_context(lookups, monkeypatch):
+    """
+    Requests sharing an app context each resolve their own user
+    """
+    use_auth(monkeypatch, BasicAuth())
+    bob = create_user("bob@hbtn.io", "pwd")
+    alice = create_user("alice@hbtn.io", "pwd")
+    client = app.test_client()
+    with app.app_context():
+        for user in (bob, alice, bob):
+            response = client.get("/api/v1/users/me",
+                                  headers=basic(user.email, "pwd"))
+            assert response.get_json()["id"] == user.id
+        response = client.get("/api/v1/users/me",
+                              headers=basic("bob@hbtn.io", "wrong"))
+        assert response.status_code == 403
+
+
+def test_session_exp_auth_instances_share_sessions(lookups, monkeypatch):
+    """
+    A session created through one SessionExpAuth is seen by another, as
+    when the views import a second copy of the app module
+    """
+    use_auth(monkeypatch, SessionExpAuth())
+    user = create_user("bob@hbtn.io", "pwd")
+    client = app.test_client()
+    response = client.post("/api/v1/auth_session/login",
+                           data={"email": "bob@hbtn.io", "password": "pwd"})
+    session_id = response.headers["Set-Cookie"].split(";")[0].split("=")[1]
+    assert SessionExpAuth().user_id_for_session_id(session_id) == user.id
+
+    use_auth(monkeypatch, SessionExpAuth())
+    response = client.get("/api/v1/users/me")
+    assert response.get_json()["id"] == user.id
+
+
+def test_session_token_auth_instances_share_key_and_revocations(
+        lookups, monkeypatch):
+    """
+    Tokens signed by one SessionTokenAuth are accepted by another, even
+    without SESSION_TOKEN_SECRET, and a logout through one is seen by all
+    """
+    monkeypatch.delenv("SESSION_TOKEN_SECRET", raising=False)
+    use_auth(monkeypatch, SessionTokenAuth())
+    user = create_user("bob@hbtn.io", "pwd")
+    client = app.test_client()
+    client.post("/api/v1/auth_session/login",
+                data={"email": "bob@hbtn.io", "password": "pwd"})
+    other = SessionTokenAuth()
+    use_auth(monkeypatch, other)
+    assert client.get("/api/v1/users/me").get_json()["id"] == user.id
+
+    use_auth(monkeypatch, SessionTokenAuth())
+    assert client.delete("/api/v1/auth_session/logout").status_code == 200
+    use_auth(monkeypatch, other)
+    assert client.get("/api/v1/users/me").status_code == 403
+
+
+def test_request_user_outside_a_request():
+    """
+    Without a request, request_user() is current_user()
+    """
+    assert BasicAuth().request_user() is None
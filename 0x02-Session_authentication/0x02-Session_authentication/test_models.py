@@ -0,0 +1,186 @@
+#!/usr/bin/env python3
+"""
+Tests of the models, on every storage engine
+"""
+import weakref
+
+import pytest
+
+import models.base
+from models.engine import file_storage
+from models.engine.file_storage import FileStorage, WriteBehindFlusher
+from models.engine.sqlite_storage import SQLiteStorage
+from models.user import User
+from models.user_session import UserSession
+
+
+@pytest.fixture(params=["file", "sqlite"])
+def storage(request, tmp_path, use_storage):
+    """
+    Empty storage engine of STORAGE_TYPE `request.param`, in tmp_path
+    """
+    if request.param == "sqlite":
+        return use_storage(SQLiteStorage(str(tmp_path / "db.sqlite3")))
+    return use_storage(FileStorage())
+
+
+def test_empty(storage):
+    """
+    A new store has no object
+    """
+    assert User.count() == 0
+    assert User.all() == []
+    assert User.search({"email": "bob@hbtn.io"}) == []
+    assert User.get("nope") is None
+
+
+def test_save_get_search(storage):
+    """
+    Saved objects are found by ID, indexed and other attributes
+    """
+    u = User(email="a@hbtn.io", first_name="A")
+    u.password = "pwd"
+    u.save()
+    v = User(email="b@hbtn.io", first_name="A")
+    v.save()
+    w = User(first_name="C")
+    w.save()
+
+    assert User.count() == 3
+    assert User.get(u.id) == u
+    assert User.get(u.id).is_valid_password("pwd")
+    assert User.search({"email": "a@hbtn.io"}) == [u]
+    assert User.search({"first_name": "A"}) == [u, v]
+    assert User.search({"email": None}) == [w]
+    assert User.search({"email": "a@hbtn.io", "first_name": "Z"}) == []
+    assert [user.id for user in User.all()] == [u.id, v.id, w.id]
+
+
+def test_update_keeps_order(storage):
+    """
+    Changing an indexed attribute moves the object to its new value,
+    and results stay in insertion order
+    """
+    u = User(email="a@hbtn.io")
+    u.save()
+    v = User(email="b@hbtn.io")
+    v.save()
+    u.email = "b@hbtn.io"
+    u.save()
+
+    assert User.search({"email": "a@hbtn.io"}) == []
+    assert [user.id for user in User.search({"email": "b@hbtn.io"})] == \
+        [u.id, v.id]
+    assert [user.id for user in User.all()] == [u.id, v.id]
+
+
+def test_remove(storage):
+    """
+    Removed objects are gone, removing twice is harmless
+    """
+    u = User(email="a@hbtn.io")
+    u.save()
+    u.remove()
+    u.remove()
+    assert User.count() == 0
+    assert User.get(u.id) is None
+    assert User.search({"email": "a@hbtn.io"}) == []
+
+
+def test_bulk(storage):
+    """
+    save_many and remove_many persist several objects at once
+    """
+    users = [User(email="{}@hbtn.io".format(i)) for i in range(10)]
+    User.save_many(users)
+    assert User.count() == 10
+    removed = User.remove_many([users[0].id, users[1].id, "nope"])
+    assert removed == [users[0].id, users[1].id]
+    assert User.count() == 8
+    assert User.search({"email": "5@hbtn.io"}) == [users[5]]
+
+
+def test_page(storage):
+    """
+    Pages cover every object once, in (created_at, id) order
+    """
+    User.save_many(User(email="{}@hbtn.io".format(i)) for i in range(5))
+    seen = []
+    after = None
+    while True:
+        page = User.page(2, after)
+        seen.extend(page)
+        if len(page) < 2:
+            break
+        after = (page[-1].created_at, page[-1].id)
+    keys = [(user.created_at, user.id) for user in seen]
+    assert keys == sorted(keys)
+    assert {user.id for user in seen} == {user.id for user in User.all()}
+
+
+def test_reload(storage):
+    """
+    Objects survive a dump and a load
+    """
+    u = User(email="a@hbtn.io", first_name="A")
+    u.password = "pwd"
+    u.save()
+    s = UserSession(user_id=u.id, session_id="s1")
+    s.save()
+    User.save_to_file()
+    User.load_from_file()
+    UserSession.load_from_file()
+
+    user = User.get(u.id)
+    assert user.to_json() == u.to_json()
+    assert user.is_valid_password("pwd")
+    assert User.search({"email": "a@hbtn.io"}) == [u]
+    assert UserSession.search({"session_id": "s1"})[0].user_id == u.id
+
+
+@pytest.mark.skipif(models.base.MODEL_LAYOUT != "dict",
+                    reason="slotted layouts have no __weakref__")
+def test_weakref(storage):
+    """
+    Models can be weakly referenced
+    """
+    u = User()
+    assert weakref.ref(u)() is u
+
+
+def test_shared_journal_compaction(storage, monkeypatch):
+    """
+    Compacting a shared journal keeps the objects of this process
+    """
+    if not isinstance(storage, FileStorage):
+        pytest.skip("file storage only")
+    monkeypatch.setattr(file_storage, "STORE_SHARED", True)
+    monkeypatch.setattr(file_storage, "PERSISTENCE_MODE", "journal")
+    monkeypatch.setattr(file_storage, "JOURNAL_MIN_ENTRIES", 3)
+    monkeypatch.setattr(file_storage, "JOURNAL_MAX_RATIO", 1)
+    u = User(email="a@hbtn.io")
+    for _ in range(10):
+        u.save()
+        assert User.get(u.id) is u
+
+
+def test_flusher_retries_failed_writes():
+    """
+    A failed write-behind flush keeps the class dirty
+    """
+    written = []
+
+    def write(cls):
+        if not written:
+            written.append(None)
+            raise OSError("disk full")
+        written.append(cls)
+
+    flusher = WriteBehindFlusher(write, 3600, 1000)
+    flusher.dirty["User"] = 2
+    with pytest.raises(OSError):
+        flusher.flush()
+    assert flusher.dirty == {"User": 2}
+    flusher.flush()
+    assert flusher.dirty == {}
+    assert written == [None, "User"]
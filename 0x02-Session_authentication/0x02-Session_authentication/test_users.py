@@ -0,0 +1,72 @@
+#!/usr/bin/env python3
+"""
+Tests of the Users views
+"""
+import base64
+import json
+
+import pytest
+
+import api.v1.app
+from api.v1.app import app
+from api.v1.views import users
+from models.engine.file_storage import FileStorage
+from models.user import User
+
+
+@pytest.fixture
+def client(use_storage, monkeypatch):
+    """
+    Test client of the app without authentication, on an empty storage
+    """
+    use_storage(FileStorage())
+    monkeypatch.setattr(api.v1.app, "auth", None)
+    monkeypatch.setitem(app.config, "AUTH", None)
+    return app.test_client()
+
+
+def cursor(key) -> str:
+    """
+    Cursor of an arbitrary JSON key
+    """
+    return base64.urlsafe_b64encode(json.dumps(key).encode()).decode()
+
+
+@pytest.mark.parametrize("key", [
+    ["2020-01-01T00:00:00+00:00", "x"],
+    ["2020-01-01T00:00:00", 1],
+    ["2020-01-01T00:00:00", None],
+    ["not a date", "x"],
+    ["2020-01-01T00:00:00"],
+])
+def test_invalid_cursor(client, key):
+    """
+    Cursors that do not hold a naive date and a string ID are rejected
+    """
+    User(email="bob@hbtn.io").save()
+    response = client.get("/api/v1/users?limit=1&cursor=" + cursor(key))
+    assert response.status_code == 400
+    assert response.get_json() == {"error": "invalid cursor"}
+
+
+def test_pages_and_stream(client):
+    """
+    Pages and the stream list every user once, in (created_at, id) order
+    """
+    User.save_many(User(email="{}@hbtn.io".format(i)) for i in range(10))
+    expected = [user.id for user in sorted(
+        User.all(), key=lambda user: (user.created_at, user.id))]
+
+    paged = []
+    url = "/api/v1/users?limit=3"
+    while True:
+        body = client.get(url).get_json()
+        paged.extend(user["id"] for user in body["users"])
+        if body["next_cursor"] is None:
+            break
+        url = "/api/v1/users?limit=3&cursor=" + body["next_cursor"]
+    assert paged == expected
+    assert [user.id for user in users.iter_users(3)] == expected
+
+    response = client.get("/api/v1/users?stream=1")
+    assert [user["id"] for user in json.loads(response.data)] == expected